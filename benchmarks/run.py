@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmarks/run.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""
+Benchmark the fetch, scan and report code paths against synthetic data.
+
+Repositories and reports of a configurable size are generated, the
+repositories are served from local HTTP, FTP (requires pyftpdlib) and
+git-daemon servers, and the end-to-end scan latency and throughput of each
+source is measured along with the report rendering and loading methods.
+Results are written as JSON and can be compared to a stored baseline:
+
+  python -m benchmarks.run --output results.json --baseline baseline.json
+"""
+
+import argparse
+import collections
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks import servers
+from benchmarks import synthetic
+from jesse import download
+from jesse import fetch
+from jesse import metrics
+from jesse import prescan
+from jesse import report
+from jesse import runner
+
+__version__ = '1.0'
+
+def _measure(function, iterations, setup=None):
+	samples = []
+	for _ in range(iterations):
+		if setup is not None:
+			setup()
+		start = time.perf_counter()
+		function()
+		samples.append(time.perf_counter() - start)
+	return {
+		'iterations': iterations,
+		'max': max(samples),
+		'mean': statistics.mean(samples),
+		'median': statistics.median(samples),
+		'min': min(samples)
+	}
+
+def _scan(source, destination, downloader):
+	timings = collections.OrderedDict()
+	scan_path = fetch.smart_fetch(source, destination, allow_file=True, downloader=downloader, timings=timings)
+	with metrics.timed(timings, 'prescan'):
+		prescan_result = prescan.prescan(scan_path)
+	scanner = runner.SubprocessRunner(scan_path, sys.executable, excluded_paths=prescan_result.excluded_paths, timings=timings)
+	scanner.run()
+	scanner.wait()
+	scanner.get_report()
+	return timings
+
+def benchmark_scans(arguments, work_path):
+	source_path = synthetic.generate_repository(
+		os.path.join(work_path, 'repository'),
+		files=arguments.files,
+		lines=arguments.lines,
+		findings=arguments.findings_per_file,
+		seed=arguments.seed
+	)
+	serve_path = os.path.join(work_path, 'serve')
+	os.mkdir(serve_path)
+	synthetic.generate_archive(source_path, os.path.join(serve_path, 'repository.tar.gz'))
+	synthetic.generate_git_repository(source_path, os.path.join(serve_path, 'repository.git'))
+
+	sources = collections.OrderedDict()
+	sources['file'] = (None, 'file://' + source_path)
+	sources['http'] = (servers.HTTPServer(serve_path), 'repository.tar.gz')
+	if servers.has_pyftpdlib:
+		sources['ftp'] = (servers.FTPServer(serve_path), 'repository.tar.gz')
+	else:
+		print('[-] skipping the ftp benchmark, pyftpdlib is not available')
+	if shutil.which('git'):
+		sources['git'] = (servers.GitDaemon(serve_path), 'repository.git')
+	else:
+		print('[-] skipping the git benchmark, git is not available')
+
+	results = collections.OrderedDict()
+	downloader = download.Downloader(backoff=0.1)
+	for name, (server, path) in sources.items():
+		url = path if server is None else server.start().url + path
+		destination = os.path.join(work_path, 'checkout')
+		phases = collections.defaultdict(list)
+		def scan():
+			for phase, duration in _scan(url, destination, downloader).items():
+				phases[phase].append(duration)
+		def setup():
+			if os.path.exists(destination):
+				shutil.rmtree(destination)
+		try:
+			print("[*] benchmarking scans from: {0}".format(name))
+			result = _measure(scan, arguments.iterations, setup=setup)
+		finally:
+			setup()
+			if server is not None:
+				server.stop()
+		result['throughput'] = 1.0 / result['mean']
+		result['phases'] = {phase: statistics.median(durations) for phase, durations in phases.items()}
+		results['scan.' + name] = result
+	downloader.close()
+	return results
+
+def benchmark_reports(arguments, work_path):
+	data = synthetic.generate_report_data(
+		findings=arguments.findings,
+		snippet_lines=arguments.snippet_lines,
+		files=arguments.files,
+		seed=arguments.seed
+	)
+	bandit_report = report.Report(data)
+	json_file = os.path.join(work_path, 'report.json')
+	pdf_file = os.path.join(work_path, 'report.pdf')
+	results = collections.OrderedDict()
+	print('[*] benchmarking reports')
+	results['report.to_text'] = _measure(bandit_report.to_text, arguments.iterations)
+	results['report.to_json_file'] = _measure(lambda: bandit_report.to_json_file(json_file), arguments.iterations)
+	results['report.from_json_file'] = _measure(lambda: report.Report.from_json_file(json_file), arguments.iterations)
+	try:
+		results['report.to_pdf_file'] = _measure(lambda: bandit_report.to_pdf_file(pdf_file), arguments.iterations)
+	except (OSError, RuntimeError) as error:
+		print("[-] skipping the pdf benchmark ({0})".format(error))
+	return results
+
+def compare(results, baseline, tolerance):
+	"""
+	Compare benchmark results to a baseline.
+
+	:param dict results: The results of the current run.
+	:param dict baseline: The results of a previous run to compare against.
+	:param float tolerance: The fraction by which the median may increase before it is a regression.
+	:return: The names of the benchmarks which regressed and their change in the median.
+	:rtype: dict
+	"""
+	regressions = {}
+	for name, result in results.items():
+		if name not in baseline:
+			continue
+		change = (result['median'] - baseline[name]['median']) / baseline[name]['median']
+		if change > tolerance:
+			regressions[name] = change
+	return regressions
+
+def main():
+	parser = argparse.ArgumentParser(description='Jesse James (CLI) - Benchmarks', conflict_handler='resolve')
+	parser.add_argument('-b', '--baseline', dest='baseline', type=argparse.FileType('r'), help='a results file to compare against')
+	parser.add_argument('-i', '--iterations', dest='iterations', default=5, type=int, help='the number of times to run each benchmark')
+	parser.add_argument('-o', '--output', dest='output', help='the file to write the results to')
+	parser.add_argument('-t', '--tolerance', dest='tolerance', default=0.1, type=float, help='the allowed fractional increase over the baseline')
+	parser.add_argument('--files', dest='files', default=100, type=int, help='the number of files in synthetic repositories')
+	parser.add_argument('--findings', dest='findings', default=500, type=int, help='the number of findings in synthetic reports')
+	parser.add_argument('--findings-per-file', dest='findings_per_file', default=1, type=int, help='the number of findings in each synthetic file')
+	parser.add_argument('--lines', dest='lines', default=200, type=int, help='the number of lines in each synthetic file')
+	parser.add_argument('--seed', dest='seed', default=0, type=int, help='the seed for generating synthetic data')
+	parser.add_argument('--skip-reports', dest='run_reports', action='store_false', default=True, help='skip the report benchmarks')
+	parser.add_argument('--skip-scans', dest='run_scans', action='store_false', default=True, help='skip the scan benchmarks')
+	parser.add_argument('--snippet-lines', dest='snippet_lines', default=3, type=int, help='the number of code lines in each synthetic finding')
+	parser.add_argument('-v', '--version', action='version', version='%(prog)s Version: ' + __version__)
+	arguments = parser.parse_args()
+
+	results = collections.OrderedDict()
+	work_path = tempfile.mkdtemp(prefix='jesse-benchmark-')
+	try:
+		if arguments.run_scans:
+			results.update(benchmark_scans(arguments, work_path))
+		if arguments.run_reports:
+			results.update(benchmark_reports(arguments, work_path))
+	finally:
+		shutil.rmtree(work_path)
+
+	output = {
+		'parameters': {key: getattr(arguments, key) for key in ('files', 'findings', 'findings_per_file', 'iterations', 'lines', 'seed', 'snippet_lines')},
+		'platform': platform.platform(),
+		'python_version': platform.python_version(),
+		'results': results,
+		'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+	}
+	for name, result in results.items():
+		print("{0:<24} median: {1:.4f}s".format(name, result['median']))
+	if arguments.output:
+		with open(arguments.output, 'w') as file_h:
+			json.dump(output, file_h, sort_keys=True, indent=2, separators=(',', ': '))
+		print('[*] wrote results to: ' + arguments.output)
+
+	if arguments.baseline is None:
+		return 0
+	baseline = json.load(arguments.baseline)
+	if baseline.get('parameters') != output['parameters']:
+		print('[-] warning: the baseline was generated with different parameters')
+	regressions = compare(results, baseline['results'], arguments.tolerance)
+	for name, change in sorted(regressions.items()):
+		print("[-] regression in {0}: median increased by {1:.1%}".format(name, change))
+	return 1 if regressions else 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmarks/servers.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import functools
+import http.server
+import logging
+import socket
+import subprocess
+import threading
+import time
+
+try:
+	import pyftpdlib.authorizers
+	import pyftpdlib.handlers
+	import pyftpdlib.log
+	import pyftpdlib.servers
+except ImportError:
+	has_pyftpdlib = False
+else:
+	has_pyftpdlib = True
+
+def _free_port():
+	with socket.socket() as sock:
+		sock.bind(('127.0.0.1', 0))
+		return sock.getsockname()[1]
+
+def _wait_for_port(port, timeout=10):
+	expiration = time.time() + timeout
+	while time.time() < expiration:
+		try:
+			socket.create_connection(('127.0.0.1', port), timeout=1).close()
+		except OSError:
+			time.sleep(0.05)
+		else:
+			return
+	raise RuntimeError("timed out waiting for port {0:d} to open".format(port))
+
+class _QuietRequestHandler(http.server.SimpleHTTPRequestHandler):
+	protocol_version = 'HTTP/1.1'
+	def log_message(self, *args):
+		pass
+
+class HTTPServer(object):
+	"""Serve the files in a directory over HTTP from a background thread."""
+	def __init__(self, directory):
+		handler = functools.partial(_QuietRequestHandler, directory=directory)
+		self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+		self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+	@property
+	def url(self):
+		return "http://127.0.0.1:{0:d}/".format(self._server.server_address[1])
+
+	def start(self):
+		self._thread.start()
+		return self
+
+	def stop(self):
+		self._server.shutdown()
+		self._server.server_close()
+
+class FTPServer(object):
+	"""Serve the files in a directory over anonymous FTP from a background thread."""
+	def __init__(self, directory):
+		if not has_pyftpdlib:
+			raise RuntimeError('the ftp server requires pyftpdlib')
+		authorizer = pyftpdlib.authorizers.DummyAuthorizer()
+		authorizer.add_anonymous(directory)
+		handler = type('BenchmarkFTPHandler', (pyftpdlib.handlers.FTPHandler,), {'authorizer': authorizer})
+		pyftpdlib.log.config_logging(level=logging.WARNING)
+		self._server = pyftpdlib.servers.FTPServer(('127.0.0.1', 0), handler)
+		self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'handle_exit': False}, daemon=True)
+
+	@property
+	def url(self):
+		return "ftp://127.0.0.1:{0:d}/".format(self._server.address[1])
+
+	def start(self):
+		self._thread.start()
+		return self
+
+	def stop(self):
+		self._server.close_all()
+
+class GitDaemon(object):
+	"""Serve the git repositories in a directory using git-daemon."""
+	def __init__(self, directory):
+		self.directory = directory
+		self.port = _free_port()
+		self._proc_h = None
+
+	@property
+	def url(self):
+		return "git://127.0.0.1:{0:d}/".format(self.port)
+
+	def start(self):
+		self._proc_h = subprocess.Popen(
+			[
+				'git',
+				'daemon',
+				'--reuseaddr',
+				'--export-all',
+				'--listen=127.0.0.1',
+				"--port={0:d}".format(self.port),
+				'--base-path=' + self.directory,
+				self.directory
+			],
+			stdout=subprocess.DEVNULL,
+			stderr=subprocess.DEVNULL
+		)
+		_wait_for_port(self.port)
+		return self
+
+	def stop(self):
+		self._proc_h.terminate()
+		self._proc_h.wait()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmarks/synthetic.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import datetime
+import os
+import random
+import shutil
+import subprocess
+import tarfile
+
+import bandit
+
+# code snippets which bandit reports findings for
+FINDING_SNIPPETS = (
+	'import pickle\nobj_{0} = pickle.loads(data_{0})\n',
+	'import subprocess\nsubprocess.call(cmd_{0}, shell=True)\n',
+	'result_{0} = eval(expression_{0})\n',
+	'import hashlib\ndigest_{0} = hashlib.md5(data_{0}).hexdigest()\n',
+	'password_{0} = "hunter2"\n',
+)
+TEST_IDS = (
+	('B301', 'blacklist'),
+	('B602', 'subprocess_popen_with_shell_equals_true'),
+	('B307', 'blacklist'),
+	('B324', 'hashlib'),
+	('B105', 'hardcoded_password_string'),
+)
+
+def generate_repository(path, files=100, lines=200, findings=1, seed=0):
+	"""
+	Generate a directory of Python source files to scan.
+
+	:param str path: The directory to create.
+	:param int files: The number of source files to create.
+	:param int lines: The approximate number of lines in each file.
+	:param int findings: The number of findings to place in each file.
+	:param int seed: The seed used to make the generated files reproducible.
+	:return: The directory that was created.
+	:rtype: str
+	"""
+	rng = random.Random(seed)
+	os.makedirs(path)
+	for file_id in range(files):
+		package = os.path.join(path, "package_{0:d}".format(file_id // 25))
+		if not os.path.isdir(package):
+			os.mkdir(package)
+			open(os.path.join(package, '__init__.py'), 'w').close()
+		body = []
+		for line_id in range(lines):
+			body.append("value_{0:d} = {1:d} * {2:d}\n".format(line_id, rng.randint(0, 1000), rng.randint(0, 1000)))
+		for finding_id in range(findings):
+			snippet = rng.choice(FINDING_SNIPPETS).format(finding_id)
+			body.insert(rng.randint(0, len(body)), snippet)
+		with open(os.path.join(package, "module_{0:d}.py".format(file_id)), 'w') as file_h:
+			file_h.write(''.join(body))
+	return path
+
+def generate_archive(source_path, archive_path):
+	"""Create a gzip compressed tar archive of the directory at *source_path*."""
+	with tarfile.open(archive_path, 'w:gz') as tar_h:
+		tar_h.add(source_path, arcname=os.path.basename(source_path))
+	return archive_path
+
+def generate_git_repository(source_path, repository_path):
+	"""Create a bare git repository containing a single commit of *source_path*."""
+	work_path = repository_path + '.work'
+	shutil.copytree(source_path, work_path)
+	environment = dict(
+		os.environ,
+		GIT_AUTHOR_NAME='benchmark',
+		GIT_AUTHOR_EMAIL='benchmark@localhost',
+		GIT_COMMITTER_NAME='benchmark',
+		GIT_COMMITTER_EMAIL='benchmark@localhost'
+	)
+	for args in (('init', '--quiet'), ('add', '--all'), ('commit', '--quiet', '--message', 'synthetic repository')):
+		subprocess.check_call(('git',) + args, cwd=work_path, env=environment)
+	subprocess.check_call(('git', 'clone', '--quiet', '--bare', work_path, repository_path))
+	shutil.rmtree(work_path)
+	return repository_path
+
+def generate_report_data(findings=100, snippet_lines=3, files=10, seed=0, path='/tmp/synthetic'):
+	"""
+	Generate the data of a bandit JSON report with the jesse-james extra
+	data suitable for loading with :py:class:`jesse.report.Report`.
+
+	:param int findings: The number of findings in the report.
+	:param int snippet_lines: The number of source lines in each finding's code snippet.
+	:param int files: The number of distinct files the findings are spread across.
+	:param int seed: The seed used to make the generated data reproducible.
+	:param str path: The directory which the report's files are located in.
+	:rtype: dict
+	"""
+	rng = random.Random(seed)
+	results = []
+	for _ in range(findings):
+		test_id, test_name = rng.choice(TEST_IDS)
+		line_number = rng.randint(snippet_lines, 5000)
+		first_line = line_number - (snippet_lines // 2)
+		code = ''.join("{0:d} value = function_call(argument_{1:d})\n".format(first_line + offset, offset) for offset in range(snippet_lines))
+		results.append({
+			'code': code,
+			'filename': os.path.join(path, "package/module_{0:d}.py".format(rng.randrange(files))),
+			'issue_confidence': rng.choice(bandit.RANKING[1:]),
+			'issue_severity': rng.choice(bandit.RANKING[1:]),
+			'issue_text': 'Synthetic issue text describing why this pattern may be dangerous and what to do about it.',
+			'line_number': line_number,
+			'line_range': [line_number],
+			'test_id': test_id,
+			'test_name': test_name
+		})
+	totals = {'SEVERITY.' + ranking: sum(1 for result in results if result['issue_severity'] == ranking) for ranking in bandit.RANKING}
+	totals.update({'CONFIDENCE.' + ranking: sum(1 for result in results if result['issue_confidence'] == ranking) for ranking in bandit.RANKING})
+	return {
+		'errors': [],
+		'generated_at': datetime.datetime(2016, 1, 1).strftime('%Y-%m-%dT%H:%M:%SZ'),
+		'metrics': {'_totals': totals},
+		'results': results,
+		'_jj': {
+			'name': 'Synthetic Report',
+			'path': path,
+			'scan_duration': 0.0,
+			'timings': {},
+			'uid': 'synthetic',
+			'url': 'file://' + path
+		}
+	}
@@ -0,0 +1,440 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  jesse/download.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import base64
+import collections
+import ftplib
+import hashlib
+import http.client
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import smoke_zephyr.utilities
+
+CHUNK_SIZE = 0x10000
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+class DownloadError(Exception):
+	"""Raised when a resource can not be downloaded and retrying will not help."""
+	pass
+
+class DownloadSizeError(DownloadError):
+	"""Raised when a resource is larger than the maximum size allowed."""
+	pass
+
+class _RetryableError(Exception):
+	pass
+
+class ConnectionPool(object):
+	"""
+	A thread safe pool of idle keep-alive connections, grouped by a hashable
+	key such as the scheme, host and port that the connection was opened to.
+	"""
+	def __init__(self, max_idle=4):
+		self.max_idle = max_idle
+		self._idle = collections.defaultdict(collections.deque)
+		self._lock = threading.Lock()
+
+	def acquire(self, key):
+		with self._lock:
+			idle = self._idle.get(key)
+			if idle:
+				return idle.pop()
+		return None
+
+	def release(self, key, connection):
+		with self._lock:
+			idle = self._idle[key]
+			if len(idle) < self.max_idle:
+				idle.append(connection)
+				return
+		self.discard(connection)
+
+	def discard(self, connection):
+		try:
+			if isinstance(connection, ftplib.FTP):
+				connection.quit()
+			else:
+				connection.close()
+		except (OSError, EOFError, ftplib.Error):
+			connection.close()
+
+	def close(self):
+		with self._lock:
+			connections = [connection for idle in self._idle.values() for connection in idle]
+			self._idle.clear()
+		for connection in connections:
+			self.discard(connection)
+
+class Downloader(object):
+	"""
+	Download remote files over HTTP(S) and FTP(S). Connections are kept alive
+	and reused per host, interrupted transfers are resumed using HTTP Range or
+	FTP REST requests and transient failures are retried with an exponential
+	backoff. When a cache directory is specified, downloaded files are kept
+	along with their validators (ETag / Last-Modified for HTTP, modification
+	time and size for FTP) and an unchanged resource is served from the cache.
+	"""
+	def __init__(self, cache_directory=None, retries=4, backoff=1.0, timeout=60, max_redirects=5, cache_max_size=None, cache_max_age=None):
+		"""
+		:param str cache_directory: An optional directory to cache downloaded files in.
+		:param int retries: The number of times to retry a failed download.
+		:param float backoff: The initial delay in seconds between retries, doubled after each attempt.
+		:param int timeout: The socket timeout in seconds to use for connections.
+		:param int max_redirects: The maximum number of HTTP redirects to follow.
+		:param int cache_max_size: The maximum size in bytes of the cache, the least recently used files are evicted first.
+		:param int cache_max_age: The maximum age in seconds of cached files.
+		"""
+		self.cache_directory = cache_directory
+		self.cache_max_size = cache_max_size
+		self.cache_max_age = cache_max_age
+		self._cache_lock = threading.Lock()
+		if cache_directory is not None and not os.path.isdir(cache_directory):
+			os.makedirs(cache_directory)
+		self.retries = retries
+		self.backoff = backoff
+		self.timeout = timeout
+		self.max_redirects = max_redirects
+		self.pool = ConnectionPool()
+
+	def close(self):
+		self.pool.close()
+
+	def download(self, url, file_h, creds=None, max_size=None):
+		"""
+		Download the resource at *url* and write it to *file_h*. The file
+		object must be opened in binary mode and be both seekable and
+		truncatable so partial transfers can be resumed or restarted.
+
+		:param str url: The URL of the resource to download, without credentials.
+		:param file_h: The file object to write the downloaded data to.
+		:param tuple creds: An optional username and password to authenticate with.
+		:param int max_size: The maximum size in bytes of the resource, larger resources are not downloaded.
+		:return: Whether or not the resource was served from the cache.
+		:rtype: bool
+		"""
+		creds = tuple(creds or (None, None))
+		parsed_url = urllib.parse.urlparse(url)
+		scheme = parsed_url.scheme.lower()
+		if scheme in ('http', 'https'):
+			handler = self._download_http
+		elif scheme in ('ftp', 'ftps'):
+			handler = self._download_ftp
+		else:
+			raise ValueError('unsupported url scheme: ' + scheme)
+
+		# state is kept between attempts so a resumed transfer can be validated
+		state = {}
+		attempt = 0
+		while True:
+			try:
+				return handler(url, file_h, creds, state, max_size)
+			except (_RetryableError, OSError, EOFError, http.client.HTTPException, ftplib.error_temp, ftplib.error_reply) as error:
+				if attempt >= self.retries:
+					raise DownloadError("failed to download {0} after {1} attempts ({2})".format(url, attempt + 1, error)) from error
+			time.sleep(self.backoff * (2 ** attempt))
+			attempt += 1
+
+	def _cache_paths(self, url, creds):
+		# the credentials are part of the key because they may grant access to
+		# different content at the same url
+		key = hashlib.sha256(json.dumps([url, creds[0], creds[1]]).encode('utf-8')).hexdigest()
+		return os.path.join(self.cache_directory, key + '.data'), os.path.join(self.cache_directory, key + '.json')
+
+	def _cache_load(self, url, creds):
+		if self.cache_directory is None:
+			return None
+		data_path, meta_path = self._cache_paths(url, creds)
+		if not (os.path.isfile(data_path) and os.path.isfile(meta_path)):
+			return None
+		with open(meta_path, 'r') as file_h:
+			try:
+				return json.load(file_h)
+			except ValueError:
+				return None
+
+	def _cache_restore(self, url, creds, file_h):
+		data_path, _ = self._cache_paths(url, creds)
+		file_h.seek(0)
+		file_h.truncate()
+		with open(data_path, 'rb') as cache_h:
+			shutil.copyfileobj(cache_h, file_h)
+		# update the modification time to track the least recently used files
+		os.utime(data_path)
+
+	def _cache_write(self, path, write):
+		# write to a unique temporary file so concurrent writers never collide
+		tmp_fd, tmp_path = tempfile.mkstemp(dir=self.cache_directory, suffix='.tmp')
+		try:
+			with os.fdopen(tmp_fd, 'wb') as tmp_h:
+				write(tmp_h)
+			os.replace(tmp_path, path)
+		except Exception:
+			os.remove(tmp_path)
+			raise
+
+	def _cache_store(self, url, creds, file_h, validators):
+		if self.cache_directory is None or not any(validators.values()):
+			return
+		data_path, meta_path = self._cache_paths(url, creds)
+		file_h.flush()
+		with open(file_h.name, 'rb') as src_h:
+			self._cache_write(data_path, lambda tmp_h: shutil.copyfileobj(src_h, tmp_h))
+		validators = dict(validators, url=url)
+		self._cache_write(meta_path, lambda tmp_h: tmp_h.write(json.dumps(validators).encode('utf-8')))
+		self.prune_cache()
+
+	def prune_cache(self):
+		"""Evict cached files which are older than the maximum age or exceed the maximum size."""
+		if self.cache_directory is None or (self.cache_max_size is None and self.cache_max_age is None):
+			return
+		with self._cache_lock:
+			entries = []
+			for entry in os.scandir(self.cache_directory):
+				if not entry.name.endswith('.data'):
+					continue
+				try:
+					stat = entry.stat()
+				except FileNotFoundError:
+					continue
+				entries.append((stat.st_mtime, stat.st_size, entry.path))
+			entries.sort()
+			total = sum(size for _, size, _ in entries)
+			now = time.time()
+			for mtime, size, data_path in entries:
+				expired = self.cache_max_age is not None and now - mtime > self.cache_max_age
+				oversized = self.cache_max_size is not None and total > self.cache_max_size
+				if not (expired or oversized):
+					continue
+				for path in (data_path, data_path[:-len('.data')] + '.json'):
+					try:
+						os.remove(path)
+					except FileNotFoundError:
+						pass
+				total -= size
+
+	def _http_connect(self, scheme, netloc, reuse=True):
+		host, port = smoke_zephyr.utilities.parse_server(netloc, (443 if scheme == 'https' else 80))
+		key = (scheme, host, port)
+		connection = self.pool.acquire(key) if reuse else None
+		reused = connection is not None
+		if connection is None:
+			if scheme == 'https':
+				connection = http.client.HTTPSConnection(host, port, timeout=self.timeout)
+			else:
+				connection = http.client.HTTPConnection(host, port, timeout=self.timeout)
+		return key, connection, reused
+
+	def _http_send(self, parsed_url, headers):
+		path = urllib.parse.urlunparse(('', '', parsed_url.path or '/', parsed_url.params, parsed_url.query, ''))
+		reuse = True
+		while True:
+			key, connection, reused = self._http_connect(parsed_url.scheme.lower(), parsed_url.netloc, reuse=reuse)
+			try:
+				connection.request('GET', path, headers=headers)
+				return key, connection, connection.getresponse()
+			except (OSError, http.client.HTTPException):
+				self.pool.discard(connection)
+				# an idle keep-alive connection may have been closed by the
+				# server, retry immediately on a new one without a backoff
+				if not reused:
+					raise
+				reuse = False
+
+	def _http_request(self, url, headers):
+		# returns the connection's pool key, the connection and the response
+		# after following any redirects
+		for _ in range(self.max_redirects + 1):
+			key, connection, response = self._http_send(urllib.parse.urlparse(url), headers)
+			if response.status not in REDIRECT_CODES:
+				return key, connection, response
+			location = response.getheader('Location')
+			response.read()
+			self._http_release(key, connection, response)
+			if not location:
+				raise DownloadError("received http status {0} without a location".format(response.status))
+			url = urllib.parse.urljoin(url, location)
+		raise DownloadError('exceeded the maximum number of redirects')
+
+	def _http_release(self, key, connection, response):
+		if response.will_close:
+			self.pool.discard(connection)
+		else:
+			self.pool.release(key, connection)
+
+	def _check_size(self, url, size, max_size):
+		if max_size is not None and size is not None and size > max_size:
+			raise DownloadSizeError("the size of {0} exceeds the limit of {1}".format(url, smoke_zephyr.utilities.format_bytes_size(max_size)))
+
+	def _download_http(self, url, file_h, creds, state, max_size):
+		headers = {'Accept-Encoding': 'identity'}
+		username, password = creds
+		if username is not None:
+			headers['Authorization'] = 'Basic ' + base64.b64encode("{0}:{1}".format(username, password).encode('utf-8')).decode('utf-8')
+		cached = self._cache_load(url, creds)
+		offset = file_h.tell()
+		if offset:
+			headers['Range'] = "bytes={0}-".format(offset)
+			if state.get('etag') and not state['etag'].startswith('W/'):
+				headers['If-Range'] = state['etag']
+			elif state.get('last_modified'):
+				headers['If-Range'] = state['last_modified']
+		elif cached:
+			if cached.get('etag'):
+				headers['If-None-Match'] = cached['etag']
+			if cached.get('last_modified'):
+				headers['If-Modified-Since'] = cached['last_modified']
+
+		key, connection, response = self._http_request(url, headers)
+		try:
+			if response.status == 304 and cached:
+				response.read()
+				self._http_release(key, connection, response)
+				self._cache_restore(url, creds, file_h)
+				self._check_size(url, file_h.tell(), max_size)
+				return True
+			if response.status == 206:
+				content_range = response.getheader('Content-Range', '')
+				if not content_range.startswith("bytes {0}-".format(offset)):
+					file_h.seek(0)
+					file_h.truncate()
+					raise _RetryableError('received an unexpected content range: ' + content_range)
+			elif response.status == 200:
+				file_h.seek(0)
+				file_h.truncate()
+				state['etag'] = response.getheader('ETag')
+				state['last_modified'] = response.getheader('Last-Modified')
+			elif response.status == 416 and offset:
+				# the range is no longer satisfiable, start over from the beginning
+				file_h.seek(0)
+				file_h.truncate()
+				raise _RetryableError('the requested range was not satisfiable')
+			elif response.status >= 500:
+				raise _RetryableError("received http status {0}".format(response.status))
+			else:
+				raise DownloadError("received http status {0} for {1}".format(response.status, url))
+
+			self._check_size(url, None if response.length is None else file_h.tell() + response.length, max_size)
+			while True:
+				chunk = response.read(CHUNK_SIZE)
+				if not chunk:
+					break
+				file_h.write(chunk)
+				self._check_size(url, file_h.tell(), max_size)
+			if response.length:
+				raise _RetryableError('the connection was closed before the transfer completed')
+		except Exception:
+			self.pool.discard(connection)
+			raise
+		self._http_release(key, connection, response)
+		self._cache_store(url, creds, file_h, {
+			'etag': state.get('etag'),
+			'last_modified': state.get('last_modified')
+		})
+		return False
+
+	def _ftp_connect(self, scheme, netloc, creds):
+		username, password = creds
+		if scheme == 'ftps':
+			host, port = smoke_zephyr.utilities.parse_server(netloc, 990)
+		else:
+			host, port = smoke_zephyr.utilities.parse_server(netloc, 21)
+		key = (scheme, host, port, username, password)
+		connection = self.pool.acquire(key)
+		if connection is not None:
+			try:
+				connection.voidcmd('NOOP')
+			except (OSError, EOFError, ftplib.Error):
+				self.pool.discard(connection)
+				connection = None
+		if connection is None:
+			connection = ftplib.FTP_TLS(timeout=self.timeout) if scheme == 'ftps' else ftplib.FTP(timeout=self.timeout)
+			connection.connect(host, port)
+			connection.login(username or '', password or '')
+			if scheme == 'ftps':
+				connection.prot_p()
+		return key, connection
+
+	def _ftp_validators(self, connection, path):
+		validators = {'mdtm': None, 'size': None}
+		try:
+			validators['mdtm'] = connection.voidcmd('MDTM ' + path).split(' ', 1)[-1].strip()
+			validators['size'] = connection.size(path)
+		except ftplib.error_perm:
+			pass
+		return validators
+
+	def _download_ftp(self, url, file_h, creds, state, max_size):
+		parsed_url = urllib.parse.urlparse(url)
+		path = urllib.parse.unquote(parsed_url.path)
+		key, connection = self._ftp_connect(parsed_url.scheme.lower(), parsed_url.netloc, creds)
+		try:
+			connection.voidcmd('TYPE I')
+			validators = self._ftp_validators(connection, path)
+			self._check_size(url, validators['size'], max_size)
+			cached = self._cache_load(url, creds)
+			offset = file_h.tell()
+			if cached and validators['mdtm'] and cached.get('mdtm') == validators['mdtm'] and cached.get('size') == validators['size']:
+				if offset:
+					file_h.seek(0)
+					file_h.truncate()
+				self.pool.release(key, connection)
+				self._cache_restore(url, creds, file_h)
+				return True
+			def write(data):
+				file_h.write(data)
+				self._check_size(url, file_h.tell(), max_size)
+			try:
+				connection.retrbinary('RETR ' + path, write, blocksize=CHUNK_SIZE, rest=(offset or None))
+			except ftplib.error_perm as error:
+				if not (offset and str(error).startswith('50')):
+					raise DownloadError("failed to retrieve {0} ({1})".format(url, error)) from error
+				# the server does not support REST, start over from the beginning
+				file_h.seek(0)
+				file_h.truncate()
+				raise _RetryableError('the server does not support resuming transfers') from error
+			if validators['size'] is not None and file_h.tell() != validators['size']:
+				raise _RetryableError('the transfer size does not match the file size')
+		except Exception:
+			self.pool.discard(connection)
+			raise
+		self.pool.release(key, connection)
+		self._cache_store(url, creds, file_h, validators)
+		return False
+
+default_downloader = Downloader()
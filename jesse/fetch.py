@@ -32,34 +32,66 @@
 #  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 #
 
-import base64
 import collections
-import ftplib
+import fcntl
 import os
 import re
 import shutil
 import subprocess
 import sys
 import tempfile
+import time
 import urllib.parse
 
+from jesse import download
+from jesse import metrics
+
 import git
-import smoke_zephyr.utilities
 
+FICLONE = 0x40049409
+LOCAL_MODES = ('copy', 'hardlink', 'in-place', 'reflink')
 MAKEDIR_MODE = 0o770
 Creds = collections.namedtuple('Creds', ('username', 'password'))
 
-def _fetch_remote(source, destination, parsed_url, creds, tmp_file, tmp_path):
-	if parsed_url['scheme'] in ('ftp', 'ftps'):
-		if parsed_url['scheme'] == 'ftp':
-			connection = ftplib.FTP()
-			connection.connect(*smoke_zephyr.utilities.parse_server(parsed_url['netloc'], 21))
-		else:
-			connection = ftplib.FTP_TLS()
-			connection.connect(*smoke_zephyr.utilities.parse_server(parsed_url['netloc'], 990))
-		connection.login(creds.username or '', creds.password or '')
-		connection.retrbinary('RETR ' + parsed_url['path'], tmp_file.write)
-		connection.quit()
+def _hardlink_or_copy(source, destination):
+	try:
+		os.link(source, destination)
+	except OSError:
+		# cross-device links and file systems without hardlink support
+		shutil.copy2(source, destination)
+	return destination
+
+def _reflink_or_copy(source, destination):
+	if sys.platform.startswith('linux'):
+		with open(source, 'rb') as src_h, open(destination, 'wb') as dst_h:
+			try:
+				fcntl.ioctl(dst_h.fileno(), FICLONE, src_h.fileno())
+			except OSError:
+				pass
+			else:
+				shutil.copystat(source, destination)
+				return destination
+	shutil.copy2(source, destination)
+	return destination
+
+def _fetch_local_directory(source, destination, local_mode):
+	if local_mode == 'in-place':
+		return source
+	if local_mode == 'copy':
+		copy_function = shutil.copy2
+	elif local_mode == 'hardlink':
+		copy_function = _hardlink_or_copy
+	elif local_mode == 'reflink':
+		copy_function = _reflink_or_copy
+	else:
+		raise ValueError('unknown local mode: ' + local_mode)
+	shutil.copytree(source, destination, symlinks=True, copy_function=copy_function)
+	return destination
+
+def _fetch_remote(source, destination, parsed_url, creds, tmp_file, tmp_path, downloader=None, max_size=None):
+	if parsed_url['scheme'] in ('ftp', 'ftps', 'http', 'https'):
+		downloader = downloader or download.default_downloader
+		downloader.download(urllib.parse.urlunparse(parsed_url.values()), tmp_file, creds=creds, max_size=max_size)
 	elif parsed_url['scheme'] in ('git', 'git+ssh', 'git+http', 'git+https'):
 		parsed_url['scheme'] = parsed_url['scheme'].split('+', 1)[-1]
 		branch = parsed_url['fragment']
@@ -77,18 +109,8 @@ def _fetch_remote(source, destination, parsed_url, creds, tmp_file, tmp_path):
 		if branch_ref is None:
 			raise ValueError('failed to find reference to remote branch name: ' + branch)
 		branch_ref.checkout(b=branch)
-	elif parsed_url['scheme'] in ('http', 'https'):
-		request = urllib.request.Request(urllib.parse.urlunparse(parsed_url.values()))
-		if creds.username is not None:
-			request.add_header(
-				'Authorization',
-				'Basic ' + base64.b64encode("{0}:{1}".format(creds.username, creds.password).encode('utf-8')).decode('utf-8')
-			)
-		url_h = urllib.request.urlopen(request)
-		shutil.copyfileobj(url_h, tmp_file)
-		url_h.close()
-
-def fetch(source, destination, allow_file=False):
+
+def fetch(source, destination, allow_file=False, downloader=None, local_mode='copy', timings=None, max_size=None, before_unpack=None):
 	"""
 	Fetch a group of files either from a file archive or version control
 	repository.
@@ -105,12 +127,19 @@ def fetch(source, destination, allow_file=False):
 	  - https
 
 	:param str source: The source URL to retrieve.
-	:param str destination: The directory into which the files should be placed.
+	:param str destination: The directory into which the files should be placed, archives are downloaded to its parent.
 	:param bool allow_file: Whether or not to permit the file:// URL for processing local resources.
-	:return: The destination directory that was used.
+	:param downloader: The downloader to use for HTTP and FTP resources, the shared default is used when not specified.
+	:type downloader: :py:class:`jesse.download.Downloader`
+	:param str local_mode: How file:// directories are processed, one of :py:data:`.LOCAL_MODES`.
+	:param dict timings: An optional dictionary to record the duration of the fetch and unpack phases in.
+	:param int max_size: The maximum size in bytes of a downloaded archive, git repositories are not limited.
+	:param before_unpack: An optional callable which is called with no arguments after an archive is downloaded and before it is unpacked.
+	:return: The directory containing the files, for in-place scans this is the source directory.
 	:rtype: str
 	"""
 	source = source.strip()
+	timings = {} if timings is None else timings
 	if os.path.exists(destination):
 		raise ValueError('destination must not be an existing directory')
 
@@ -131,23 +160,43 @@ def fetch(source, destination, allow_file=False):
 			raise RuntimeError('file: URLs are not allowed to be processed')
 		tmp_path = parsed_url['path']
 		if os.path.isdir(tmp_path):
-			shutil.copytree(tmp_path, destination, symlinks=True)
+			# in-place scans use the directory read-only as is, the others
+			# create an isolated copy of it
+			with metrics.timed(timings, 'fetch'):
+				return _fetch_local_directory(os.path.abspath(tmp_path), destination, local_mode)
 		elif os.path.isfile(tmp_path):
-			shutil.unpack_archive(tmp_path, destination)
+			with metrics.timed(timings, 'unpack'):
+				shutil.unpack_archive(tmp_path, destination)
+		else:
+			raise ValueError('the source path does not exist: ' + tmp_path)
 	else:
-		tmp_fd, tmp_path = tempfile.mkstemp(suffix='_' + os.path.basename(parsed_url['path']))
+		# download next to the destination so the archive is subject to the
+		# same file system and workspace quota as its contents
+		tmp_fd, tmp_path = tempfile.mkstemp(
+			suffix='_' + os.path.basename(parsed_url['path']),
+			dir=os.path.dirname(os.path.abspath(destination))
+		)
 		os.close(tmp_fd)
 		tmp_file = open(tmp_path, 'wb')
 		try:
-			_fetch_remote(source, destination, parsed_url, creds, tmp_file, tmp_path)
+			with metrics.timed(timings, 'fetch'):
+				_fetch_remote(source, destination, parsed_url, creds, tmp_file, tmp_path, downloader=downloader, max_size=max_size)
+				tmp_file.flush()
 			if os.stat(tmp_path).st_size:
-				shutil.unpack_archive(tmp_path, destination)
+				if before_unpack is not None:
+					before_unpack()
+				with metrics.timed(timings, 'unpack'):
+					shutil.unpack_archive(tmp_path, destination)
 		finally:
 			tmp_file.close()
 			os.remove(tmp_path)
-	return
+		if not os.path.isdir(destination):
+			raise ValueError('no files were fetched from: ' + urllib.parse.urlunparse(parsed_url.values()))
+	return destination
 
-def smart_fetch(source, destination, allow_file=False):
+def smart_fetch(source, destination, allow_file=False, downloader=None, local_mode='copy', timings=None, max_size=None, before_unpack=None):
+	timings = {} if timings is None else timings
+	start = time.monotonic()
 	source = source.strip()
 	parsed_url = urllib.parse.urlparse(source, scheme='file')
 	parsed_url = collections.OrderedDict(zip(('scheme', 'netloc', 'path', 'params', 'query', 'fragment'), parsed_url))
@@ -174,7 +223,17 @@ def smart_fetch(source, destination, allow_file=False):
 			parsed_url['fragment'] = match.group('branch')
 
 	source = urllib.parse.urlunparse(parsed_url.values())
-	return fetch(source, destination, allow_file=allow_file)
+	timings['resolve'] = time.monotonic() - start
+	return fetch(
+		source,
+		destination,
+		allow_file=allow_file,
+		downloader=downloader,
+		local_mode=local_mode,
+		timings=timings,
+		max_size=max_size,
+		before_unpack=before_unpack
+	)
 
 def main():
 	if len(sys.argv) < 3:
@@ -33,42 +33,145 @@
 #
 
 import argparse
+import collections
+import concurrent.futures
+import functools
 import json
 import os
 import queue
 import shutil
-import tempfile
+import subprocess
+import sys
 import threading
+import time
 import traceback
+import weakref
 
+from jesse import download
 from jesse import fetch
+from jesse import metrics
+from jesse import prescan
 from jesse import pushbullet_listener
 from jesse import runner
+from jesse import workspace
+import jesse.report
 import jesse.utilities as utilities
 
 import pushbullet
 import smoke_zephyr.utilities
+import tabulate
 
 __version__ = '1.0'
 
-def _run_scan(arguments, scan_target, allow_file=False):
-	tmp_path = arguments.tmp_path
-	if tmp_path is None:
-		tmp_path = os.path.join(tempfile.gettempdir(), tempfile.gettempprefix() + smoke_zephyr.utilities.random_string_alphanumeric(8))
+metrics_registry = metrics.MetricsRegistry()
+metric_phase_duration = metrics_registry.histogram('jesse_phase_duration_seconds', 'The duration of each phase of a scan.', labels=('phase',))
+metric_queue_depth = metrics_registry.gauge('jesse_queue_depth', 'The number of targets waiting to be scanned.')
+metric_scan_duration = metrics_registry.histogram('jesse_scan_duration_seconds', 'The end-to-end latency of scan requests.')
+metric_scans = metrics_registry.counter('jesse_scans_total', 'The number of scan requests processed.', labels=('status',))
 
-	fetch.smart_fetch(scan_target, tmp_path, allow_file=allow_file)
+def _observe_timings(timings):
+	for phase, duration in timings.items():
+		metric_phase_duration.observe(duration, phase=phase)
 
-	scanner = runner.SubprocessRunner(
-		tmp_path,
-		shutil.which('python')
-	)
+def _push_note(account, timings, *args, **kwargs):
+	with metrics.timed(timings, 'notify'):
+		account.push_note(*args, **kwargs)
+	metric_phase_duration.observe(timings['notify'], phase='notify')
+
+def _wait_scanner(scanner):
+	try:
+		scanner.wait()
+	except subprocess.TimeoutExpired:
+		pass
 
-	print('[*] scanning: ' + tmp_path)
-	scanner.run()
-	scanner.wait()
-	if not arguments.save_path:
-		shutil.rmtree(tmp_path)
-	return scanner
+def _run_scan(arguments, scan_target, allow_file=False, budget=None, timings=None, log=print, on_run=None):
+	return _run_scans(arguments, scan_target, allow_file=allow_file, budget=budget, timings=timings, log=log, on_run=on_run)[0]
+
+def _run_scans(arguments, scan_target, allow_file=False, budget=None, pyenv_versions=None, timings=None, log=print, on_run=None):
+	workspaces = arguments.workspaces
+	# the caller may pass the timings in to retain them if the scan fails
+	timings = collections.OrderedDict() if timings is None else timings
+	# the workspace is removed if anything fails and retained when saving
+	with workspaces.allocate(save=arguments.save_path) as tmp_path:
+		# downloads are limited to the space the quota allows and checked again
+		# before they are unpacked, unpacked archives and git repositories are
+		# only checked once they have been fetched
+		try:
+			scan_path = fetch.smart_fetch(
+				scan_target,
+				tmp_path,
+				allow_file=allow_file,
+				downloader=arguments.downloader,
+				local_mode=arguments.local_mode,
+				timings=timings,
+				max_size=workspaces.available(),
+				before_unpack=workspaces.check_quota
+			)
+		except download.DownloadSizeError as error:
+			raise workspace.WorkspaceQuotaError(str(error)) from error
+		workspaces.check_quota()
+
+		with metrics.timed(timings, 'prescan'):
+			prescan_result = prescan.prescan(
+				scan_path,
+				includes=arguments.includes,
+				excludes=(prescan.DEFAULT_EXCLUDES if arguments.default_excludes else ()) + tuple(arguments.excludes or ()),
+				max_file_size=arguments.max_file_size
+			)
+		log('[*] pre-scan: ' + prescan_result.summary())
+		if prescan_result.pruned_paths:
+			pruned_paths = sorted(prescan_result.pruned_paths)
+			text = ', '.join(pruned_paths[:10])
+			if len(pruned_paths) > 10:
+				text += ", and {0:,} more".format(len(pruned_paths) - 10)
+			log('[*] pre-scan excluded directories with python files: ' + text)
+		if budget:
+			budget.check(prescan_result)
+
+		# every scanner shares the single checkout, which none of them modify
+		if pyenv_versions:
+			scanners = [runner.PyenvSubprocessRunner(
+				scan_path,
+				arguments.pyenv_path,
+				pyenv_version,
+				excluded_paths=prescan_result.excluded_paths,
+				timings=collections.OrderedDict(timings)
+			) for pyenv_version in pyenv_versions]
+		else:
+			scanners = [runner.SubprocessRunner(
+				scan_path,
+				shutil.which('python'),
+				excluded_paths=prescan_result.excluded_paths,
+				timings=timings
+			)]
+
+		log('[*] scanning: ' + scan_path)
+		for scanner in scanners:
+			scanner.run()
+			if on_run is not None:
+				on_run(scanner)
+		# wait in parallel so no scanner blocks on a full output pipe, a scanner
+		# that times out is left with its error set so the others are kept
+		with concurrent.futures.ThreadPoolExecutor(max_workers=len(scanners)) as executor:
+			for _ in executor.map(_wait_scanner, scanners):
+				pass
+		if all(scanner.error is not None for scanner in scanners):
+			raise scanners[0].error
+	return scanners
+
+def _write_report(report_directory, scanner, report, pdf=True):
+	timings = report.data['_jj']['timings']
+	os.mkdir(report_directory)
+	with open(os.path.join(report_directory, 'stderr.txt'), 'wb') as file_h:
+		file_h.write(scanner.stderr)
+	with open(os.path.join(report_directory, 'stdout.txt'), 'wb') as file_h:
+		file_h.write(scanner.stdout)
+	with metrics.timed(timings, 'json_write'):
+		report.to_json_file(os.path.join(report_directory, 'report.json'))
+	if not pdf:
+		return
+	with metrics.timed(timings, 'pdf_render'):
+		report.to_pdf_file(os.path.join(report_directory, 'report.pdf'))
 
 def main_pushbullet(arguments):
 	device_name = 'Bandit'
@@ -87,23 +190,39 @@ def main_pushbullet(arguments):
 	listener.start()
 	print('[*] started listener for pushbullet links shared with: ' + device_name)
 
+	# targets that exceeded the budget are deferred until the queue is idle
+	deferred = collections.deque()
+	metric_queue_depth.set_function(lambda: work_queue.qsize() + len(deferred))
+	if arguments.metrics_port:
+		metrics_registry.serve(port=arguments.metrics_port)
+		print("[*] serving metrics on port {0:d}".format(arguments.metrics_port))
+	metrics_writer = None
+	if arguments.metrics_file:
+		metrics_writer = metrics_registry.write_textfile_periodically(arguments.metrics_file, interval=arguments.metrics_interval)
+		print('[*] writing metrics to: ' + arguments.metrics_file)
 	while True:
-		try:
-			work_item = work_queue.get()
-		except KeyboardInterrupt:
-			break
-		scan_uid = None
-		if work_item.get('type') == 'link':
-			scan_target = work_item.get('url')
-		elif work_item.get('type') == 'note':
+		budget = arguments.budget
+		if deferred and work_queue.empty():
+			work_item, scan_target, scan_uid = deferred.popleft()
+			budget = None
+		else:
 			try:
-				work_item['body'] = json.loads(work_item['body'])
-			except ValueError:
+				work_item = work_queue.get()
+			except KeyboardInterrupt:
+				break
+			scan_target = None
+			scan_uid = None
+			if work_item.get('type') == 'link':
+				scan_target = work_item.get('url')
+			elif work_item.get('type') == 'note':
+				try:
+					work_item['body'] = json.loads(work_item['body'])
+				except ValueError:
+					continue
+				scan_target = work_item['body'].get('url')
+				scan_uid = work_item['body'].get('uid')
+			if scan_target is None:
 				continue
-			scan_target = work_item['body'].get('url')
-			scan_uid = work_item['body'].get('uid')
-		if scan_target is None:
-			continue
 		requesting_device = next((device for device in account.devices if device.device_iden == work_item.get('source_device_iden')), None)
 		if requesting_device is None:
 			print("[*] received request to scan: {0}".format(scan_target))
@@ -113,10 +232,29 @@ def main_pushbullet(arguments):
 
 		if scan_uid is None:
 			scan_uid = utilities.generate_scan_uid(scan_target)
+		started = time.monotonic()
+		timings = collections.OrderedDict()
 		try:
-			scanner = _run_scan(arguments, scan_target)
+			scanner = _run_scan(arguments, scan_target, budget=budget, timings=timings)
 			report = scanner.get_report()
+		except prescan.BudgetExceededError as error:
+			if arguments.over_budget == 'defer':
+				print("[*] deferred scan of {0}: {1}".format(scan_target, error.reason))
+				deferred.append((work_item, scan_target, scan_uid))
+				metric_scans.inc(status='deferred')
+			else:
+				print("[-] rejected scan of {0}: {1}".format(scan_target, error.reason))
+				account.push_note(
+					'Bandit Scan Rejected',
+					"The scan of {0} was rejected, {1}".format(scan_target, error.reason),
+					device=requesting_device
+				)
+				metric_scans.inc(status='rejected')
+			continue
 		except Exception:
+			metric_scans.inc(status='failed')
+			metric_scan_duration.observe(time.monotonic() - started)
+			_observe_timings(timings)
 			account.push_note(
 				'Bandit Scan Error',
 				"An error occurred while scanning: {0}".format(scan_target),
@@ -139,44 +277,306 @@ def main_pushbullet(arguments):
 		# head start before the user is notified that the job completed
 		thread = threading.Timer(
 			60,
-			account.push_note,
-			('Bandit Report Summary', report_text),
+			_push_note,
+			(account, scanner.timings, 'Bandit Report Summary', report_text),
 			{'device': requesting_device}
 		)
 		thread.start()
 
-		report_directory = os.path.join(arguments.report_directory, scan_uid)
-		os.mkdir(report_directory)
-		with open(os.path.join(report_directory, 'stderr.txt'), 'wb') as file_h:
-			file_h.write(scanner.stderr)
-		with open(os.path.join(report_directory, 'stdout.txt'), 'wb') as file_h:
-			file_h.write(scanner.stdout)
-		report.to_json_file(os.path.join(report_directory, 'report.json'))
-		report.to_pdf_file(os.path.join(report_directory, 'report.pdf'))
+		try:
+			_write_report(os.path.join(arguments.report_directory, scan_uid), scanner, report)
+		except Exception:
+			metric_scans.inc(status='failed')
+			traceback.print_exc()
+			continue
+		finally:
+			# the notification is timed separately once it has been sent
+			_observe_timings(scanner.timings)
+			metric_scan_duration.observe(time.monotonic() - started)
+		metric_scans.inc(status='completed')
 	listener.close()
+	if metrics_writer is not None:
+		metrics_writer.set()
+		metrics_registry.write_textfile(arguments.metrics_file)
+
+class BatchProgress(object):
+	headers = ('Target', 'Status', 'Duration', 'High', 'Medium', 'Low')
+	def __init__(self, targets, output=None):
+		self.output = output or sys.stdout
+		self.rows = collections.OrderedDict((target, [target, 'queued', '', '', '', '']) for target in targets)
+		self._lock = threading.Lock()
+		self._redraw = self.output.isatty()
+
+	def render(self):
+		return tabulate.tabulate(self.rows.values(), headers=self.headers, tablefmt='simple')
+
+	def log(self, target, message):
+		# messages would be cleared by the next redraw of the table
+		if self._redraw:
+			return
+		with self._lock:
+			self.output.write("{0} ({1})\n".format(message, target))
+			self.output.flush()
+
+	def update(self, target, status, duration=None, report=None):
+		with self._lock:
+			row = self.rows[target]
+			row[1] = status
+			if duration is not None:
+				row[2] = "{0:.1f}s".format(duration)
+			if report is not None:
+				totals = report.data['metrics']['_totals']
+				row[3:] = [totals['SEVERITY.HIGH'], totals['SEVERITY.MEDIUM'], totals['SEVERITY.LOW']]
+			if self._redraw:
+				# clear the terminal and redraw the whole table in place
+				self.output.write('\x1b[2J\x1b[H' + self.render() + '\n')
+			else:
+				self.output.write("[*] {0}: {1}\n".format(status, target))
+			self.output.flush()
+
+class _ScannerTracker(object):
+	"""Track the running scanners of a batch so they can be killed when it is interrupted."""
+	def __init__(self):
+		self.cancelled = threading.Event()
+		self.scanners = weakref.WeakSet()
+		self._lock = threading.Lock()
+
+	def add(self, scanner):
+		with self._lock:
+			self.scanners.add(scanner)
+		# a scanner started while the batch was being cancelled is killed here
+		if self.cancelled.is_set():
+			scanner.kill()
+
+	def kill_all(self):
+		self.cancelled.set()
+		with self._lock:
+			scanners = list(self.scanners)
+		for scanner in scanners:
+			scanner.kill()
+
+def _batch_scan(arguments, progress, tracker, scan_target):
+	progress.update(scan_target, 'scanning')
+	started = time.monotonic()
+	scan_uid = utilities.generate_scan_uid(scan_target)
+	try:
+		scanner = _run_scan(
+			arguments,
+			scan_target,
+			allow_file=True,
+			budget=arguments.budget,
+			log=functools.partial(progress.log, scan_target),
+			on_run=tracker.add
+		)
+		report = scanner.get_report()
+		report.data['_jj']['name'] = scan_target
+		report.data['_jj']['uid'] = scan_uid
+		report.data['_jj']['url'] = scan_target
+		_write_report(os.path.join(arguments.report_directory, scan_uid), scanner, report, pdf=arguments.pdf)
+	except (prescan.BudgetExceededError, workspace.WorkspaceQuotaError) as error:
+		progress.update(scan_target, 'rejected', duration=time.monotonic() - started)
+		return {'status': 'rejected', 'target': scan_target, 'error': str(error)}
+	except Exception as error:
+		progress.update(scan_target, 'failed', duration=time.monotonic() - started)
+		return {'status': 'failed', 'target': scan_target, 'error': "{0}: {1}".format(error.__class__.__name__, error)}
+	duration = time.monotonic() - started
+	progress.update(scan_target, 'completed', duration=duration, report=report)
+	return {
+		'duration': duration,
+		'findings': len(report.data['results']),
+		'status': 'completed',
+		'target': scan_target,
+		'test_ids': collections.Counter(result['test_id'] for result in report.data['results']),
+		'totals': report.data['metrics']['_totals'],
+		'uid': scan_uid
+	}
+
+def main_batch(arguments):
+	with arguments.targets_file:
+		targets = [line.strip() for line in arguments.targets_file]
+	targets = list(collections.OrderedDict.fromkeys(target for target in targets if target and not target.startswith('#')))
+	if not targets:
+		print('[-] no targets were specified')
+		return
+
+	if not os.path.isdir(arguments.report_directory):
+		os.makedirs(arguments.report_directory)
+		print('[*] created report directory: ' + arguments.report_directory)
+
+	progress = BatchProgress(targets)
+	started = time.monotonic()
+	executor = concurrent.futures.ThreadPoolExecutor(max_workers=arguments.workers)
+	tracker = _ScannerTracker()
+	futures = [executor.submit(_batch_scan, arguments, progress, tracker, target) for target in targets]
+	try:
+		results = [future.result() for future in futures]
+	except KeyboardInterrupt:
+		# the worker threads can only exit once their bandit processes do
+		executor.shutdown(wait=False, cancel_futures=True)
+		tracker.kill_all()
+		raise
+	executor.shutdown()
+	elapsed = time.monotonic() - started
+
+	completed = [result for result in results if result['status'] == 'completed']
+	statuses = collections.Counter(result['status'] for result in results)
+	test_ids = collections.Counter()
+	for result in completed:
+		test_ids.update(result['test_ids'])
+	print('')
+	print(progress.render())
+	print('')
+	print("[*] scanned {0:,} targets in {1:.1f}s with {2:,} workers ({3})".format(
+		len(results),
+		elapsed,
+		arguments.workers,
+		', '.join("{0}:{1:,}".format(*item) for item in sorted(statuses.items()))
+	))
+	print(tabulate.tabulate(
+		[[severity, sum(result['totals']['SEVERITY.' + severity] for result in completed)] for severity in ('HIGH', 'MEDIUM', 'LOW')],
+		headers=('Severity', 'Findings'),
+		tablefmt='simple'
+	))
+	if test_ids:
+		print('')
+		print(tabulate.tabulate(test_ids.most_common(10), headers=('ID', 'Occurrences'), tablefmt='simple'))
+	for result in results:
+		if 'error' in result:
+			print("[-] {0} {1}: {2}".format(result['status'], result['target'], result['error']))
+
+	summary_file = os.path.join(arguments.report_directory, 'summary.json')
+	with open(summary_file, 'w') as file_h:
+		json.dump({'duration': elapsed, 'results': results}, file_h, sort_keys=True, indent=2, separators=(',', ': '))
+	print('[*] wrote the batch summary to: ' + summary_file)
 
 def main_scan(arguments):
-	scanner = _run_scan(arguments, arguments.target, allow_file=True)
-	scanner.get_report()
+	pyenv_versions = list(collections.OrderedDict.fromkeys(arguments.pyenv_versions or ()))
+	failures = collections.OrderedDict()
+	for pyenv_version in pyenv_versions:
+		try:
+			runner.check_interpreter(runner.pyenv_python_path(arguments.pyenv_path, pyenv_version))
+		except RuntimeError as error:
+			failures[pyenv_version] = str(error)
+			print("[-] skipping python version {0}: {1}".format(pyenv_version, error))
+	pyenv_versions = [pyenv_version for pyenv_version in pyenv_versions if pyenv_version not in failures]
+	if failures and not pyenv_versions:
+		print('[-] none of the python versions can be used')
+		return
+
+	try:
+		scanners = _run_scans(arguments, arguments.target, allow_file=True, budget=arguments.budget, pyenv_versions=pyenv_versions)
+	except (prescan.BudgetExceededError, workspace.WorkspaceQuotaError) as error:
+		print('[-] rejected scan: ' + str(error))
+		return
+	except subprocess.TimeoutExpired as error:
+		print("[-] the scan timed out after {0:.0f}s".format(error.timeout))
+		return
+	reports = []
+	for scanner in scanners:
+		version = getattr(scanner, 'pyenv_version', scanner.python_bin_path)
+		if scanner.error is not None:
+			failures[version] = "bandit timed out after {0:.0f}s".format(scanner.error.timeout)
+			print("[-] the scan timed out for python version {0}".format(version))
+			continue
+		try:
+			reports.append(scanner.get_report())
+		except ValueError:
+			failures[version] = 'bandit did not produce a report'
+			print("[-] the scan failed for python version {0}".format(version))
+			continue
+		print('[*] timings: ' + ' '.join("{0}:{1:.3f}s".format(*item) for item in scanner.timings.items()))
+	if not reports:
+		return
+	if len(reports) == 1:
+		report = reports[0]
+	else:
+		report = jesse.report.Report.merge(reports)
+		print(tabulate.tabulate(
+			[[
+				version,
+				sum(1 for result in report.data['results'] if version in result['_jj']['versions']),
+				sum(1 for result in report.data['results'] if result['_jj']['versions'] == [version])
+			] for version in report.data['_jj']['versions']],
+			headers=('Python Version', 'Findings', 'Version Specific'),
+			tablefmt='simple'
+		))
+	if failures:
+		report.data['_jj']['failed_versions'] = failures
+	report.data['_jj']['name'] = arguments.target
+	report.data['_jj']['url'] = arguments.target
+	if arguments.output:
+		report.to_json_file(arguments.output)
+		print('[*] wrote the report to: ' + arguments.output)
 
 def main():
 	parser = argparse.ArgumentParser(description='Jesse James (CLI) - Bandit Automated Scanner', conflict_handler='resolve')
-	parser.add_argument('-p', '--path', dest='tmp_path', help='the temporary store path')
-	parser.add_argument('-s', '--save', dest='save_path', action='store_true', default=False, help='don\'t delete scanned directories')
+	parser.add_argument('-l', '--local-mode', dest='local_mode', choices=fetch.LOCAL_MODES, default='in-place', help='how local directories are prepared for scanning')
+	parser.add_argument('-p', '--path', dest='workspace_root', help='the directory to create scan workspaces in')
+	parser.add_argument('--tmpfs', dest='use_tmpfs', action='store_true', default=False, help='create scan workspaces in memory (' + workspace.TMPFS_ROOT + ')')
+	parser.add_argument('--quota', dest='workspace_quota', type=int, help='the maximum size in bytes of all scan workspaces, checked after each download and fetch')
+	parser.add_argument('--keep', dest='workspace_max_saved', default=25, type=int, help='the number of saved scan directories to retain')
+	parser.add_argument('--keep-age', dest='workspace_max_age', help='the maximum age of saved scan directories to retain')
+	parser.add_argument('-c', '--cache-dir', dest='cache_directory', help='a directory to cache downloaded archives in')
+	parser.add_argument('--cache-size', dest='cache_max_size', default=0x40000000, type=int, help='the maximum size in bytes of the download cache')
+	parser.add_argument('--cache-age', dest='cache_max_age', help='the maximum age of files in the download cache')
+	parser.add_argument('-s', '--save', dest='save_path', action='store_true', default=False, help='retain scanned directories (see --keep)')
+	parser.add_argument('--include', dest='includes', action='append', metavar='PATTERN', help='a glob pattern of files to scan')
+	parser.add_argument('--exclude', dest='excludes', action='append', metavar='PATTERN', help='a glob pattern of files and directories to skip')
+	parser.add_argument('--no-default-excludes', dest='default_excludes', action='store_false', default=True, help='don\'t skip the directories excluded by default (' + ', '.join(prescan.DEFAULT_EXCLUDES) + ')')
+	parser.add_argument('--max-file-size', dest='max_file_size', default=prescan.DEFAULT_MAX_FILE_SIZE, type=int, help='the size in bytes above which files are skipped')
+	parser.add_argument('--max-files', dest='max_files', type=int, help='the maximum number of files a target may contain')
+	parser.add_argument('--max-bytes', dest='max_bytes', type=int, help='the maximum number of bytes of source a target may contain')
+	parser.add_argument('--max-scan-time', dest='max_scan_time', help='the maximum estimated time a target may take to scan')
 	parser.add_argument('-v', '--version', action='version', version='%(prog)s Version: ' + __version__)
 	sub_parsers = parser.add_subparsers()
 
 	parser_scan = sub_parsers.add_parser('scan', help='scan a single target')
 	parser_scan.set_defaults(handler=main_scan)
+	parser_scan.add_argument('-o', '--output', dest='output', help='a file to write the json report to')
+	parser_scan.add_argument('--pyenv-path', dest='pyenv_path', default=os.environ.get('PYENV_ROOT', os.path.expanduser('~/.pyenv')), help='the root of the pyenv installation')
+	parser_scan.add_argument('--pyenv-version', dest='pyenv_versions', action='append', metavar='VERSION', help='a pyenv python version to scan with (may be repeated)')
 	parser_scan.add_argument('target', help='the target url to scan')
 
+	parser_batch = sub_parsers.add_parser('batch', help='scan many targets in parallel')
+	parser_batch.set_defaults(handler=main_batch)
+	parser_batch.add_argument('--report-dir', dest='report_directory', default=os.getcwd(), help='the location to write reports to')
+	parser_batch.add_argument('--no-pdf', dest='pdf', action='store_false', default=True, help='don\'t render pdf reports')
+	parser_batch.add_argument('-w', '--workers', dest='workers', default=os.cpu_count() or 1, type=int, help='the number of targets to scan in parallel')
+	parser_batch.add_argument('targets_file', nargs='?', default='-', type=argparse.FileType('r'), help='a file of target urls, one per line (default: stdin)')
+
 	parser_pushbullet = sub_parsers.add_parser('pushbullet', help='scan links shared via pushbullet')
 	parser_pushbullet.set_defaults(handler=main_pushbullet)
 	parser_pushbullet.add_argument('--report-dir', dest='report_directory', default=os.getcwd(), help='the location to write reports to')
+	parser_pushbullet.add_argument('--over-budget', dest='over_budget', choices=('defer', 'reject'), default='defer', help='how targets exceeding the budget are handled')
+	parser_pushbullet.add_argument('--metrics-file', dest='metrics_file', help='a file to write prometheus metrics to')
+	parser_pushbullet.add_argument('--metrics-interval', dest='metrics_interval', default=15, type=float, help='the number of seconds between writes of the metrics file')
+	parser_pushbullet.add_argument('--metrics-port', dest='metrics_port', type=int, help='a local port to serve prometheus metrics on')
 	parser_pushbullet.add_argument('api_key', help='the api key to use to access pushbullet')
 	arguments = parser.parse_args()
 
-	arguments.handler(arguments)
+	arguments.budget = prescan.ScanBudget(
+		max_files=arguments.max_files,
+		max_bytes=arguments.max_bytes,
+		max_seconds=(smoke_zephyr.utilities.parse_timespan(arguments.max_scan_time) if arguments.max_scan_time else None)
+	)
+	workspace_kwargs = {
+		'quota': arguments.workspace_quota,
+		'max_saved': arguments.workspace_max_saved,
+		'max_age': (smoke_zephyr.utilities.parse_timespan(arguments.workspace_max_age) if arguments.workspace_max_age else None)
+	}
+	if arguments.use_tmpfs:
+		arguments.workspaces = workspace.WorkspaceManager.from_tmpfs(**workspace_kwargs)
+	else:
+		arguments.workspaces = workspace.WorkspaceManager(arguments.workspace_root, **workspace_kwargs)
+	arguments.downloader = download.Downloader(
+		cache_directory=arguments.cache_directory,
+		cache_max_size=arguments.cache_max_size,
+		cache_max_age=(smoke_zephyr.utilities.parse_timespan(arguments.cache_max_age) if arguments.cache_max_age else None)
+	)
+	try:
+		arguments.handler(arguments)
+	finally:
+		arguments.downloader.close()
 
 if __name__ == '__main__':
 	main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  jesse/metrics.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import bisect
+import contextlib
+import http.server
+import os
+import sys
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 1800.0)
+
+@contextlib.contextmanager
+def timed(timings, phase):
+	"""
+	Time the duration of the context and record it in seconds as *phase* in
+	the *timings* dictionary. Repeated phases are accumulated.
+
+	:param dict timings: The dictionary to record the duration in.
+	:param str phase: The name of the phase being timed.
+	"""
+	start = time.monotonic()
+	try:
+		yield
+	finally:
+		timings[phase] = timings.get(phase, 0.0) + (time.monotonic() - start)
+
+def _format_value(value):
+	if value == float('inf'):
+		return '+Inf'
+	return repr(float(value))
+
+def _format_labels(pairs):
+	if not pairs:
+		return ''
+	return '{' + ','.join("{0}=\"{1}\"".format(name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in pairs) + '}'
+
+class _Metric(object):
+	kind = None
+	def __init__(self, name, help_text, labels=()):
+		self.name = name
+		self.help_text = help_text
+		self.labels = tuple(labels)
+		self._lock = threading.Lock()
+		self._values = {}
+
+	def _key(self, labels):
+		if set(labels) != set(self.labels):
+			raise ValueError('labels must be exactly: ' + ', '.join(self.labels))
+		return tuple(labels[label] for label in self.labels)
+
+	def _samples(self):
+		with self._lock:
+			return [(tuple(zip(self.labels, key)), value) for key, value in sorted(self._values.items())]
+
+	def render(self):
+		lines = [
+			"# HELP {0} {1}".format(self.name, self.help_text),
+			"# TYPE {0} {1}".format(self.name, self.kind)
+		]
+		for pairs, value in self._samples():
+			lines.append("{0}{1} {2}".format(self.name, _format_labels(pairs), _format_value(value)))
+		return lines
+
+class Counter(_Metric):
+	kind = 'counter'
+	def inc(self, amount=1, **labels):
+		key = self._key(labels)
+		with self._lock:
+			self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+	kind = 'gauge'
+	def __init__(self, *args, **kwargs):
+		super(Gauge, self).__init__(*args, **kwargs)
+		self._function = None
+
+	def set(self, value, **labels):
+		key = self._key(labels)
+		with self._lock:
+			self._values[key] = value
+
+	def set_function(self, function):
+		"""Use *function* to retrieve the value of an unlabeled gauge when it is rendered."""
+		self._function = function
+
+	def _samples(self):
+		if self._function is not None:
+			return [((), self._function())]
+		return super(Gauge, self)._samples()
+
+class Histogram(_Metric):
+	kind = 'histogram'
+	def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+		super(Histogram, self).__init__(name, help_text, labels=labels)
+		self.buckets = tuple(sorted(buckets))
+
+	def observe(self, value, **labels):
+		key = self._key(labels)
+		with self._lock:
+			counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+			counts[bisect.bisect_left(self.buckets, value)] += 1
+			self._values[key] = (counts, total + value)
+
+	def render(self):
+		lines = [
+			"# HELP {0} {1}".format(self.name, self.help_text),
+			"# TYPE {0} {1}".format(self.name, self.kind)
+		]
+		for pairs, (counts, total) in self._samples():
+			cumulative = 0
+			for bound, count in zip(self.buckets + (float('inf'),), counts):
+				cumulative += count
+				lines.append("{0}_bucket{1} {2}".format(self.name, _format_labels(pairs + (('le', _format_value(bound)),)), cumulative))
+			lines.append("{0}_sum{1} {2}".format(self.name, _format_labels(pairs), _format_value(total)))
+			lines.append("{0}_count{1} {2}".format(self.name, _format_labels(pairs), cumulative))
+		return lines
+
+class MetricsRegistry(object):
+	"""
+	A collection of metrics which can be exported in the Prometheus text
+	exposition format, either to a file for the node exporter's textfile
+	collector or over HTTP.
+	"""
+	def __init__(self):
+		self.metrics = []
+		self._write_lock = threading.Lock()
+
+	def _register(self, metric):
+		self.metrics.append(metric)
+		return metric
+
+	def counter(self, *args, **kwargs):
+		return self._register(Counter(*args, **kwargs))
+
+	def gauge(self, *args, **kwargs):
+		return self._register(Gauge(*args, **kwargs))
+
+	def histogram(self, *args, **kwargs):
+		return self._register(Histogram(*args, **kwargs))
+
+	def render(self):
+		lines = []
+		for metric in self.metrics:
+			lines.extend(metric.render())
+		return '\n'.join(lines) + '\n'
+
+	def write_textfile(self, filename):
+		# write to a temporary file first so readers never see a partial file
+		tmp_filename = filename + '.tmp'
+		with self._write_lock:
+			with open(tmp_filename, 'w') as file_h:
+				file_h.write(self.render())
+			os.replace(tmp_filename, filename)
+
+	def write_textfile_periodically(self, filename, interval=15.0):
+		"""
+		Write the metrics to a file every *interval* seconds from a background
+		thread so the file is current even while the caller is busy.
+
+		:param str filename: The file to write the metrics to.
+		:param float interval: The number of seconds between writes.
+		:return: An event which stops the thread when it is set.
+		:rtype: :py:class:`threading.Event`
+		"""
+		stop_event = threading.Event()
+		def writer():
+			while not stop_event.wait(interval):
+				try:
+					self.write_textfile(filename)
+				except OSError as error:
+					sys.stderr.write("[-] failed to write the metrics file: {0}\n".format(error))
+		self.write_textfile(filename)
+		thread = threading.Thread(target=writer, name='MetricsWriter', daemon=True)
+		thread.start()
+		return stop_event
+
+	def serve(self, host='127.0.0.1', port=9100):
+		"""
+		Serve the metrics over HTTP from a background thread.
+
+		:param str host: The address to bind to.
+		:param int port: The port to bind to.
+		:return: The running server.
+		:rtype: :py:class:`http.server.ThreadingHTTPServer`
+		"""
+		registry = self
+		class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+			def do_GET(self):
+				if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+					self.send_error(404)
+					return
+				body = registry.render().encode('utf-8')
+				self.send_response(200)
+				self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, *args):
+				pass
+
+		server = http.server.ThreadingHTTPServer((host, port), MetricsRequestHandler)
+		thread = threading.Thread(target=server.serve_forever, name='MetricsServer', daemon=True)
+		thread.start()
+		return server
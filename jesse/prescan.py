@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  jesse/prescan.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import collections
+import fnmatch
+import os
+
+import smoke_zephyr.utilities
+
+DEFAULT_EXCLUDES = (
+	'.eggs',
+	'.git',
+	'.hg',
+	'.svn',
+	'.tox',
+	'.venv',
+	'*.egg',
+	'*.egg-info',
+	'*_pb2.py',
+	'*_pb2_grpc.py',
+	'__pycache__',
+	'_vendor',
+	'fixtures',
+	'node_modules',
+	'site-packages',
+	'third_party',
+	'vendor',
+	'venv',
+)
+# the files bandit discovers when recursively scanning a directory, others
+# never need to be excluded
+BANDIT_GLOBS = ('*.py', '*.pyw')
+DEFAULT_INCLUDES = BANDIT_GLOBS
+DEFAULT_MAX_FILE_SIZE = 0x100000
+# rough cost of a bandit scan, used to estimate the time a target will take
+SECONDS_PER_FILE = 0.01
+SECONDS_PER_BYTE = 1.0 / 0x40000
+# the amount of data checked for null bytes to detect binary files
+BINARY_CHECK_SIZE = 0x2000
+
+class BudgetExceededError(Exception):
+	"""Raised when the estimated cost of a scan exceeds the configured budget."""
+	def __init__(self, result, reason):
+		super(BudgetExceededError, self).__init__(reason)
+		self.result = result
+		self.reason = reason
+
+class PrescanResult(object):
+	def __init__(self, target_path):
+		self.target_path = target_path
+		self.byte_count = 0
+		self.excluded_paths = []
+		self.files = []
+		# relative paths of excluded directories which contain python files
+		self.pruned_paths = []
+		self.skipped = collections.Counter()
+
+	@property
+	def estimated_seconds(self):
+		return self.file_count * SECONDS_PER_FILE + self.byte_count * SECONDS_PER_BYTE
+
+	@property
+	def file_count(self):
+		return len(self.files)
+
+	def summary(self):
+		text = "{0:,} files ({1}), estimated scan time {2:.0f}s".format(
+			self.file_count,
+			smoke_zephyr.utilities.format_bytes_size(self.byte_count),
+			self.estimated_seconds
+		)
+		if self.skipped:
+			text += ', skipped ' + ', '.join("{0}:{1:,}".format(*item) for item in sorted(self.skipped.items()))
+		return text
+
+class ScanBudget(object):
+	def __init__(self, max_files=None, max_bytes=None, max_seconds=None):
+		"""
+		:param int max_files: The maximum number of files to scan.
+		:param int max_bytes: The maximum number of bytes of source code to scan.
+		:param float max_seconds: The maximum estimated scan time in seconds.
+		"""
+		self.max_files = max_files
+		self.max_bytes = max_bytes
+		self.max_seconds = max_seconds
+
+	def __bool__(self):
+		return any(limit is not None for limit in (self.max_files, self.max_bytes, self.max_seconds))
+
+	def check(self, result):
+		"""
+		Check the results of a pre-scan against the budget.
+
+		:param result: The pre-scan results to check.
+		:type result: :py:class:`.PrescanResult`
+		:raises: :py:exc:`.BudgetExceededError`
+		"""
+		if self.max_files is not None and result.file_count > self.max_files:
+			raise BudgetExceededError(result, "file count {0:,} exceeds the limit of {1:,}".format(result.file_count, self.max_files))
+		if self.max_bytes is not None and result.byte_count > self.max_bytes:
+			raise BudgetExceededError(result, "size {0} exceeds the limit of {1}".format(
+				smoke_zephyr.utilities.format_bytes_size(result.byte_count),
+				smoke_zephyr.utilities.format_bytes_size(self.max_bytes)
+			))
+		if self.max_seconds is not None and result.estimated_seconds > self.max_seconds:
+			raise BudgetExceededError(result, "estimated scan time {0:.0f}s exceeds the limit of {1:.0f}s".format(result.estimated_seconds, self.max_seconds))
+
+def _matches(path, name, patterns):
+	return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(path, pattern) for pattern in patterns)
+
+def _is_binary(path):
+	with open(path, 'rb') as file_h:
+		return b'\x00' in file_h.read(BINARY_CHECK_SIZE)
+
+def _is_scannable(filename):
+	return any(fnmatch.fnmatch(filename, pattern) for pattern in BANDIT_GLOBS)
+
+def _contains_scannable(path):
+	for _, _, filenames in os.walk(path):
+		if any(_is_scannable(filename) for filename in filenames):
+			return True
+	return False
+
+def prescan(target_path, includes=None, excludes=None, max_file_size=DEFAULT_MAX_FILE_SIZE):
+	"""
+	Walk the target directory to determine which files should be scanned and
+	estimate the cost of scanning them. Patterns are matched against both the
+	name and the path relative to *target_path* of each file and directory.
+	Excluded directories are not descended into.
+
+	The excluded paths which are returned only contain files bandit would
+	otherwise scan, and directories containing such files. A directory is
+	listed in place of its files when none of them are to be scanned.
+
+	:param str target_path: The directory to walk.
+	:param tuple includes: Glob patterns of files to scan.
+	:param tuple excludes: Glob patterns of files and directories to skip.
+	:param int max_file_size: The size in bytes above which files are skipped.
+	:return: The files to scan and the paths which bandit should exclude.
+	:rtype: :py:class:`.PrescanResult`
+	"""
+	includes = includes or DEFAULT_INCLUDES
+	excludes = DEFAULT_EXCLUDES if excludes is None else excludes
+	target_path = os.path.abspath(target_path)
+	if not os.path.isdir(target_path):
+		raise ValueError('the target path is not a directory: ' + target_path)
+	result = PrescanResult(target_path)
+	# per directory bookkeeping used to collapse excluded paths
+	children = {}
+	excluded = collections.defaultdict(list)
+	included = set()
+	walked = []
+	for root, dirnames, filenames in os.walk(target_path):
+		walked.append(root)
+		for dirname in tuple(dirnames):
+			path = os.path.join(root, dirname)
+			if _matches(os.path.relpath(path, target_path), dirname, excludes):
+				dirnames.remove(dirname)
+				result.skipped['directory'] += 1
+				if _contains_scannable(path):
+					excluded[root].append(path + os.sep)
+					result.pruned_paths.append(os.path.relpath(path, target_path))
+		children[root] = [os.path.join(root, dirname) for dirname in dirnames]
+		for filename in filenames:
+			if not _is_scannable(filename):
+				continue
+			path = os.path.join(root, filename)
+			relpath = os.path.relpath(path, target_path)
+			if not _matches(relpath, filename, includes):
+				reason = 'filtered'
+			elif _matches(relpath, filename, excludes):
+				reason = 'excluded'
+			else:
+				try:
+					size = os.stat(path).st_size
+					if max_file_size is not None and size > max_file_size:
+						reason = 'size'
+					elif _is_binary(path):
+						reason = 'binary'
+					else:
+						reason = None
+				except OSError:
+					reason = 'error'
+			if reason is None:
+				included.add(root)
+				result.files.append(path)
+				result.byte_count += size
+			else:
+				excluded[root].append(path)
+				result.skipped[reason] += 1
+
+	# os.walk is top down, so reversing it visits children before parents
+	fully_excluded = {}
+	has_excluded = {}
+	for root in reversed(walked):
+		fully_excluded[root] = root not in included and all(fully_excluded[child] for child in children[root])
+		has_excluded[root] = bool(excluded[root]) or any(has_excluded[child] for child in children[root])
+
+	pending = [target_path]
+	while pending:
+		root = pending.pop()
+		if not has_excluded[root]:
+			continue
+		if root != target_path and fully_excluded[root]:
+			# the trailing separator keeps bandit's substring matching from
+			# excluding siblings that share the same prefix
+			result.excluded_paths.append(root + os.sep)
+			continue
+		result.excluded_paths.extend(excluded[root])
+		pending.extend(children[root])
+	return result
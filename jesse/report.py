@@ -98,6 +98,10 @@ Total findings: {{ results | length }}
 #### {{ result.test_name }} ({{ result.test_id }})
 
 Severity: {{ result.issue_severity }}, Confidence: {{ result.issue_confidence }}
+{% if result._jj and result._jj.version_specific %}
+
+Only Found With Python: {{ result._jj.versions | join(', ') }}
+{% endif %}
 
 Description:
 
@@ -139,6 +143,84 @@ class Report(object):
 			data = json.load(file_h)
 		return cls(data)
 
+	@classmethod
+	def merge(cls, reports):
+		"""
+		Merge the reports of a single target which was scanned with multiple
+		Python versions. Each result is annotated with the versions it was
+		found with and whether or not it is specific to a subset of them.
+
+		Results are matched by file, test ID and overlapping line ranges rather
+		than exact line numbers because the lines which Python versions report
+		for multi-line statements and decorated definitions differ (notably
+		before and after Python 3.8). Distinct findings of the same test on
+		overlapping lines are paired in the order in which they are reported.
+
+		:param list reports: The reports to merge.
+		:return: The merged report.
+		:rtype: :py:class:`.Report`
+		"""
+		versions = [report.data.get('python_version') or str(index) for index, report in enumerate(reports, 1)]
+		results = []
+		candidates = collections.defaultdict(list)
+		for version, report in zip(versions, reports):
+			for result in report.data['results']:
+				line_range = result.get('line_range') or [result['line_number']]
+				first, last = min(line_range), max(line_range)
+				group = candidates[(result['filename'], result['test_id'])]
+				# each merged result is matched at most once per version
+				match = next((
+					candidate for candidate in group
+					if version not in candidate[0]['_jj']['versions'] and candidate[1] <= last and first <= candidate[2]
+				), None)
+				if match is None:
+					match = [dict(result, _jj={'versions': []}), first, last]
+					group.append(match)
+					results.append(match[0])
+				else:
+					match[1], match[2] = min(match[1], first), max(match[2], last)
+				match[0]['_jj']['versions'].append(version)
+		for result in results:
+			result['_jj']['version_specific'] = len(result['_jj']['versions']) < len(versions)
+
+		errors = []
+		for version, report in zip(versions, reports):
+			errors.extend(dict(error, python_version=version) for error in report.data.get('errors', []))
+		# line counts are the same for every version unless one failed to parse
+		# a file, so the largest is used while the ranking counts are recomputed
+		metrics = {}
+		for report in reports:
+			for filename, file_metrics in report.data['metrics'].items():
+				merged_metrics = metrics.setdefault(filename, {})
+				for key, value in file_metrics.items():
+					merged_metrics[key] = max(merged_metrics.get(key, value), value)
+		for filename, file_metrics in metrics.items():
+			file_results = results if filename == '_totals' else [result for result in results if result['filename'] == filename]
+			for ranking in bandit.RANKING:
+				file_metrics['CONFIDENCE.' + ranking] = sum(1 for result in file_results if result['issue_confidence'] == ranking)
+				file_metrics['SEVERITY.' + ranking] = sum(1 for result in file_results if result['issue_severity'] == ranking)
+
+		data = dict(reports[0].data)
+		data['errors'] = errors
+		data['generated_at'] = max(report.data['generated_at'] for report in reports)
+		data['metrics'] = metrics
+		data['python_version'] = ', '.join(versions)
+		data['results'] = results
+		if '_jj' in data:
+			# the scans run in parallel so each phase took as long as the slowest
+			timings = {}
+			for report in reports:
+				for phase, duration in (report.data['_jj'].get('timings') or {}).items():
+					timings[phase] = max(timings.get(phase, 0.0), duration)
+			data['_jj'] = dict(
+				data['_jj'],
+				scan_duration=max(report.data['_jj']['scan_duration'] or 0 for report in reports),
+				timings=timings,
+				version_timings=dict((version, report.data['_jj'].get('timings')) for version, report in zip(versions, reports)),
+				versions=versions
+			)
+		return cls(data)
+
 	@property
 	def generated_at(self):
 		return datetime.datetime.strptime(self.data['generated_at'], '%Y-%m-%dT%H:%M:%SZ')
@@ -232,6 +314,8 @@ class Report(object):
 				self._colored_ranking(result['issue_severity']),
 				self._colored_ranking(result['issue_confidence'])
 			))
+			if result.get('_jj', {}).get('version_specific'):
+				text.append('  Only Found With Python: ' + ', '.join(result['_jj']['versions']))
 			text.append('  Description:')
 			text.extend(['    ' + line for line in textwrap.wrap(result['issue_text'], width=maxwidth - 4)])
 			filename = result['filename']
@@ -32,41 +32,79 @@
 #  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 #
 
+import collections
 import json
 import os
 import subprocess
 import sys
+import tempfile
 import time
 
+import jesse.metrics
 import jesse.report
 
 import smoke_zephyr.utilities
 
+def check_interpreter(python_bin_path):
+	"""
+	Check that *python_bin_path* is a Python interpreter which has bandit
+	installed and can therefore be used to run a scan.
+
+	:param str python_bin_path: The path to the interpreter to check.
+	:raises RuntimeError: If the interpreter can not be used.
+	"""
+	if not os.access(python_bin_path, os.X_OK):
+		raise RuntimeError('the python interpreter does not exist: ' + python_bin_path)
+	proc_h = subprocess.run(
+		(python_bin_path, '-c', 'import bandit.cli.main'),
+		stdin=subprocess.DEVNULL,
+		stdout=subprocess.DEVNULL,
+		stderr=subprocess.DEVNULL
+	)
+	if proc_h.returncode:
+		raise RuntimeError('bandit is not installed for the python interpreter: ' + python_bin_path)
+
+def pyenv_python_path(pyenv_path, pyenv_version):
+	return os.path.abspath(os.path.join(pyenv_path, 'versions', pyenv_version, 'bin', 'python'))
+
 class SubprocessRunner(object):
-	def __init__(self, target_path, python_bin_path=None):
+	def __init__(self, target_path, python_bin_path=None, excluded_paths=None, timings=None):
 		self.target_path = os.path.abspath(target_path)
+		self.excluded_paths = list(excluded_paths or [])
 		self.proc_h = None
 		self.python_bin_path = python_bin_path or sys.executable
 		self.stdout = None
 		self.stderr = None
 		self.encoding = 'utf-8'
 		self.timeout = smoke_zephyr.utilities.parse_timespan('30m')
-		self._scan_time = None
+		self.timings = collections.OrderedDict() if timings is None else timings
+		self.scan_duration = None
+		self.error = None
+		self._config_path = None
+		self._scan_start = None
 
 	def run(self):
-		self._scan_time = time.time()
+		self._scan_start = time.monotonic()
+		args = [
+			self.python_bin_path,
+			'-m',
+			'bandit.cli.main',
+			'--format',
+			'json',
+			'--number',
+			'11',
+			'--recursive',
+			self.target_path
+		]
+		if self.excluded_paths:
+			# pass the excluded paths in a configuration file, which has no size
+			# limit unlike a command line argument, json is a subset of yaml
+			config_fd, self._config_path = tempfile.mkstemp(prefix='bandit-', suffix='.yaml')
+			with os.fdopen(config_fd, 'w') as config_h:
+				json.dump({'exclude_dirs': self.excluded_paths}, config_h)
+			args.extend(('--configfile', self._config_path))
 		self.proc_h = subprocess.Popen(
-			[
-				self.python_bin_path,
-				'-m',
-				'bandit.cli.main',
-				'--format',
-				'json',
-				'--number',
-				'11',
-				'--recursive',
-				self.target_path
-			],
+			args,
 			stdin=subprocess.PIPE,
 			stdout=subprocess.PIPE,
 			stderr=subprocess.PIPE
@@ -74,27 +112,50 @@ class SubprocessRunner(object):
 
 	def get_report(self):
 		try:
-			data = json.loads(self.stdout.decode(self.encoding))
+			with jesse.metrics.timed(self.timings, 'parse'):
+				data = json.loads(self.stdout.decode(self.encoding))
 		except json.decoder.JSONDecodeError:
 			sys.stderr.write(self.stderr.decode(self.encoding))
 			raise
 		# jesse-james extra data, some are optionally filled out later
 		data['_jj'] = {
-			'scan_duration': self._scan_time,
+			'scan_duration': self.scan_duration,
 			'name': None,
 			'path': self.target_path,
+			'timings': self.timings,
 			'uid': None,
 			'url': None
 		}
 		return jesse.report.Report(data)
 
+	def kill(self):
+		"""Kill the bandit process if it is running."""
+		if self.proc_h is not None and self.proc_h.poll() is None:
+			self.proc_h.kill()
+
 	def wait(self):
-		self.stdout, self.stderr = self.proc_h.communicate(timeout=self.timeout)
-		self._scan_time = time.time() - self._scan_time
+		try:
+			self.stdout, self.stderr = self.proc_h.communicate(timeout=self.timeout)
+		except subprocess.TimeoutExpired as error:
+			self.proc_h.kill()
+			self.stdout, self.stderr = self.proc_h.communicate()
+			self.error = error
+			raise
+		finally:
+			if self._config_path is not None:
+				os.remove(self._config_path)
+				self._config_path = None
+			self.scan_duration = time.monotonic() - self._scan_start
+			self.timings['bandit'] = self.scan_duration
 
 class PyenvSubprocessRunner(SubprocessRunner):
-	def __init__(self, target_path, pyenv_path, pyenv_version):
-		python_bin_path = os.path.abspath(os.path.join(pyenv_path, 'versions', pyenv_version, 'bin', 'python'))
-		super(PyenvSubprocessRunner, self).__init__(target_path, python_bin_path)
+	def __init__(self, target_path, pyenv_path, pyenv_version, excluded_paths=None, timings=None):
+		python_bin_path = pyenv_python_path(pyenv_path, pyenv_version)
+		super(PyenvSubprocessRunner, self).__init__(target_path, python_bin_path, excluded_paths=excluded_paths, timings=timings)
 		self.pyenv_path = pyenv_path
 		self.pyenv_version = pyenv_version
+
+	def get_report(self):
+		report = super(PyenvSubprocessRunner, self).get_report()
+		report.data.setdefault('python_version', self.pyenv_version)
+		return report
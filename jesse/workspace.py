@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  jesse/workspace.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import contextlib
+import fcntl
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import smoke_zephyr.utilities
+
+# workspaces without a lock file younger than this are still being created
+CREATION_GRACE = 60
+LOCK_FILE = '.lock'
+MARKER_FILE = '.jesse-workspace'
+SAVED_FILE = '.saved'
+TMPFS_ROOT = '/dev/shm'
+
+class WorkspaceQuotaError(Exception):
+	"""Raised when the workspace root exceeds its quota and nothing can be evicted."""
+	pass
+
+class WorkspaceManager(object):
+	"""
+	Allocate per-scan working directories beneath a common root. Workspaces
+	are removed when the scan fails or when it completes unless they are
+	saved. Saved workspaces are retained subject to a count and age policy,
+	evicting the least recently saved first, and the total size of the root
+	is kept under an optional quota.
+
+	Active workspaces hold a lock so that they are never evicted, even by
+	another process sharing the same root. Only directories containing the
+	marker file written when a workspace is allocated are ever removed, other
+	contents of the root are left alone.
+	"""
+	def __init__(self, root=None, quota=None, max_saved=None, max_age=None):
+		"""
+		:param str root: The directory to create workspaces in.
+		:param int quota: The maximum size in bytes of all workspaces.
+		:param int max_saved: The maximum number of saved workspaces to retain.
+		:param int max_age: The maximum age in seconds of saved workspaces to retain.
+		"""
+		self.root = os.path.abspath(root or os.path.join(tempfile.gettempdir(), 'jesse-james'))
+		if not os.path.isdir(self.root):
+			os.makedirs(self.root)
+		self.quota = quota
+		self.max_saved = max_saved
+		self.max_age = max_age
+		self._lock = threading.RLock()
+
+	@classmethod
+	def from_tmpfs(cls, *args, **kwargs):
+		"""Create a manager whose root is on the memory-backed file system."""
+		return cls(os.path.join(TMPFS_ROOT, 'jesse-james'), *args, **kwargs)
+
+	@contextlib.contextmanager
+	def allocate(self, prefix='scan-', save=False):
+		"""
+		Allocate a new workspace for the duration of the context. The yielded
+		path does not exist yet, making it suitable as a fetch destination.
+
+		:param str prefix: The prefix of the workspace directory's name.
+		:param bool save: Whether or not to retain the workspace after a successful scan.
+		"""
+		with self._lock:
+			self.enforce()
+			workspace_path = tempfile.mkdtemp(prefix=prefix, dir=self.root)
+			with open(os.path.join(workspace_path, MARKER_FILE), 'w'):
+				pass
+		lock_h = open(os.path.join(workspace_path, LOCK_FILE), 'w')
+		fcntl.flock(lock_h, fcntl.LOCK_EX)
+		destination = os.path.join(workspace_path, 'checkout')
+		try:
+			yield destination
+		except BaseException:
+			self._remove(workspace_path, lock_h)
+			raise
+		if save and os.path.exists(destination):
+			with open(os.path.join(workspace_path, SAVED_FILE), 'w'):
+				pass
+			lock_h.close()
+			with self._lock:
+				self.prune()
+		else:
+			self._remove(workspace_path, lock_h)
+
+	def _remove(self, workspace_path, lock_h=None):
+		shutil.rmtree(workspace_path, ignore_errors=True)
+		if lock_h is not None:
+			lock_h.close()
+
+	def _workspaces(self):
+		# only directories with the marker file were created by a manager
+		for entry in os.scandir(self.root):
+			if entry.is_dir(follow_symlinks=False) and os.path.isfile(os.path.join(entry.path, MARKER_FILE)):
+				yield entry
+
+	def _evictable(self):
+		# returns saved or abandoned workspaces sorted from oldest to newest
+		workspaces = []
+		for entry in self._workspaces():
+			lock_path = os.path.join(entry.path, LOCK_FILE)
+			try:
+				with open(lock_path, 'r') as lock_h:
+					fcntl.flock(lock_h, fcntl.LOCK_EX | fcntl.LOCK_NB)
+			except BlockingIOError:
+				continue
+			except FileNotFoundError:
+				if time.time() - entry.stat().st_mtime < CREATION_GRACE:
+					continue
+			saved_path = os.path.join(entry.path, SAVED_FILE)
+			if os.path.isfile(saved_path):
+				workspaces.append((os.stat(saved_path).st_mtime, entry.path, True))
+			else:
+				# left behind by a process that exited without cleaning up
+				workspaces.append((entry.stat().st_mtime, entry.path, False))
+		workspaces.sort()
+		return workspaces
+
+	def _size(self, path):
+		total = 0
+		for root, _, filenames in os.walk(path):
+			for filename in filenames:
+				try:
+					total += os.lstat(os.path.join(root, filename)).st_size
+				except OSError:
+					pass
+		return total
+
+	def usage(self):
+		"""
+		:return: The total size in bytes of all workspaces.
+		:rtype: int
+		"""
+		return sum(self._size(entry.path) for entry in self._workspaces())
+
+	def available(self):
+		"""
+		Get the number of bytes which can be used before the quota is exceeded
+		once every saved and abandoned workspace has been evicted.
+
+		:return: The available size in bytes, or None if there is no quota.
+		:rtype: int
+		"""
+		if self.quota is None:
+			return None
+		evictable = set(workspace_path for _, workspace_path, _ in self._evictable())
+		usage = sum(self._size(entry.path) for entry in self._workspaces() if entry.path not in evictable)
+		return max(self.quota - usage, 0)
+
+	def prune(self):
+		"""Remove abandoned workspaces and saved workspaces outside of the retention policy."""
+		saved = []
+		for mtime, workspace_path, is_saved in self._evictable():
+			if not is_saved:
+				self._remove(workspace_path)
+			elif self.max_age is not None and time.time() - mtime > self.max_age:
+				self._remove(workspace_path)
+			else:
+				saved.append(workspace_path)
+		if self.max_saved is not None:
+			while len(saved) > self.max_saved:
+				self._remove(saved.pop(0))
+
+	def check_quota(self):
+		"""
+		Evict the oldest saved workspaces until the root is within the quota.
+		Nothing is evicted when the active workspaces alone exceed the quota.
+
+		:raises: :py:exc:`.WorkspaceQuotaError`
+		"""
+		if self.quota is None:
+			return
+		usage = self.usage()
+		if usage <= self.quota:
+			return
+		evictable = [(workspace_path, self._size(workspace_path)) for _, workspace_path, _ in self._evictable()]
+		if usage - sum(size for _, size in evictable) <= self.quota:
+			for workspace_path, size in evictable:
+				self._remove(workspace_path)
+				usage -= size
+				if usage <= self.quota:
+					return
+		raise WorkspaceQuotaError("workspace usage of {0} exceeds the quota of {1}".format(
+			smoke_zephyr.utilities.format_bytes_size(usage),
+			smoke_zephyr.utilities.format_bytes_size(self.quota)
+		))
+
+	def enforce(self):
+		self.prune()
+		self.check_quota()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  tests/test_batch.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from jesse import download
+from jesse import main
+from jesse import prescan
+from jesse import workspace
+
+class BatchTests(unittest.TestCase):
+	def setUp(self):
+		self.tmp_path = tempfile.mkdtemp()
+		self.targets = []
+		for name, source in (('first', "import os\nos.system('ls')\n"), ('second', "exec(code)\n")):
+			path = os.path.join(self.tmp_path, name)
+			os.mkdir(path)
+			with open(os.path.join(path, 'module.py'), 'w') as file_h:
+				file_h.write(source)
+			self.targets.append('file://' + path)
+		self.targets.append('file://' + os.path.join(self.tmp_path, 'missing'))
+		self.report_directory = os.path.join(self.tmp_path, 'reports')
+		self.arguments = argparse.Namespace(
+			budget=prescan.ScanBudget(),
+			default_excludes=True,
+			downloader=download.Downloader(),
+			excludes=None,
+			includes=None,
+			local_mode='in-place',
+			max_file_size=prescan.DEFAULT_MAX_FILE_SIZE,
+			pdf=False,
+			report_directory=self.report_directory,
+			save_path=False,
+			targets_file=io.StringIO('\n'.join(['# comment', ''] + self.targets + self.targets[:1]) + '\n'),
+			workers=2,
+			workspaces=workspace.WorkspaceManager(os.path.join(self.tmp_path, 'workspaces'))
+		)
+
+	def tearDown(self):
+		self.arguments.downloader.close()
+		shutil.rmtree(self.tmp_path)
+
+	def test_batch(self):
+		output = io.StringIO()
+		with contextlib.redirect_stdout(output):
+			main.main_batch(self.arguments)
+		self.assertTrue(self.arguments.targets_file.closed)
+		with open(os.path.join(self.report_directory, 'summary.json'), 'r') as file_h:
+			summary = json.load(file_h)
+		# comments, blank lines and duplicate targets are ignored
+		results = summary['results']
+		self.assertEqual([result['target'] for result in results], self.targets)
+		self.assertEqual([result['status'] for result in results], ['completed', 'completed', 'failed'])
+		self.assertIn('ValueError', results[2]['error'])
+		self.assertIn('B605', results[0]['test_ids'])
+		self.assertEqual(results[1]['test_ids'], {'B102': 1})
+		for result in results[:2]:
+			self.assertTrue(os.path.isfile(os.path.join(self.report_directory, result['uid'], 'report.json')))
+		output = output.getvalue()
+		self.assertIn('completed:2, failed:1', output)
+		# scan messages are tagged with their target when the table is not redrawn
+		self.assertIn("({0})\n".format(self.targets[0]), output)
+		self.assertNotIn('\x1b[2J', output)
+
+	def test_progress_redraw(self):
+		class TTYOutput(io.StringIO):
+			def isatty(self):
+				return True
+		output = TTYOutput()
+		progress = main.BatchProgress(self.targets, output=output)
+		progress.log(self.targets[0], '[*] scanning: ' + self.targets[0])
+		self.assertEqual(output.getvalue(), '')
+		progress.update(self.targets[0], 'scanning')
+		self.assertTrue(output.getvalue().startswith('\x1b[2J\x1b[H'))
+		self.assertIn(progress.render(), output.getvalue())
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  tests/test_download.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import http.server
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import unittest.mock
+
+from benchmarks import servers
+from jesse import download
+
+DATA = os.urandom(0x40000)
+ETAG = '"synthetic"'
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+	protocol_version = 'HTTP/1.1'
+	def log_message(self, *args):
+		pass
+
+	def do_GET(self):
+		server = self.server
+		server.requests.append(dict(self.headers))
+		if server.failures:
+			server.failures -= 1
+			self.send_response(503)
+			self.send_header('Content-Length', '0')
+			self.end_headers()
+			return
+		if self.headers.get('If-None-Match') == ETAG:
+			self.send_response(304)
+			self.send_header('Content-Length', '0')
+			self.end_headers()
+			return
+		offset = 0
+		if self.headers.get('Range'):
+			offset = int(self.headers['Range'].split('=', 1)[1].rstrip('-'))
+			self.send_response(206)
+			self.send_header('Content-Range', "bytes {0}-{1}/{2}".format(offset, len(DATA) - 1, len(DATA)))
+		else:
+			self.send_response(200)
+		self.send_header('ETag', ETAG)
+		self.send_header('Content-Length', str(len(DATA) - offset))
+		self.end_headers()
+		if server.truncate:
+			server.truncate = False
+			self.wfile.write(DATA[offset:offset + 0x1000])
+			self.wfile.flush()
+			self.close_connection = True
+			return
+		self.wfile.write(DATA[offset:])
+		if server.drop_keepalive:
+			# close the connection without telling the client
+			self.close_connection = True
+
+class DownloadTests(unittest.TestCase):
+	def setUp(self):
+		self.tmp_path = tempfile.mkdtemp()
+		self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _RequestHandler)
+		self.server.daemon_threads = True
+		self.server.drop_keepalive = False
+		self.server.failures = 0
+		self.server.requests = []
+		self.server.truncate = False
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+		self.url = "http://127.0.0.1:{0:d}/archive.tar.gz".format(self.server.server_address[1])
+		self.downloader = download.Downloader(cache_directory=os.path.join(self.tmp_path, 'cache'), backoff=0.5)
+		self.sleep = unittest.mock.patch('time.sleep').start()
+
+	def tearDown(self):
+		unittest.mock.patch.stopall()
+		self.downloader.close()
+		self.server.shutdown()
+		self.server.server_close()
+		shutil.rmtree(self.tmp_path)
+
+	def _download(self, url=None, creds=None, prefix=b''):
+		with tempfile.NamedTemporaryFile(dir=self.tmp_path) as file_h:
+			file_h.write(prefix)
+			cached = self.downloader.download(url or self.url, file_h, creds=creds)
+			file_h.flush()
+			with open(file_h.name, 'rb') as read_h:
+				return cached, read_h.read()
+
+	def test_http_download(self):
+		self.assertEqual(self._download(), (False, DATA))
+		self.sleep.assert_not_called()
+
+	def test_http_resume(self):
+		self.server.truncate = True
+		self.assertEqual(self._download(), (False, DATA))
+		self.assertEqual(len(self.server.requests), 2)
+		self.assertEqual(self.server.requests[1]['Range'], 'bytes=4096-')
+		self.assertEqual(self.server.requests[1]['If-Range'], ETAG)
+
+	def test_http_not_modified(self):
+		self._download()
+		self.assertEqual(self._download(), (True, DATA))
+		self.assertEqual(self.server.requests[1]['If-None-Match'], ETAG)
+
+	def test_http_retry_backoff(self):
+		self.server.failures = 2
+		self.assertEqual(self._download(), (False, DATA))
+		self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [0.5, 1.0])
+
+	def test_http_retry_exhausted(self):
+		self.server.failures = self.downloader.retries + 1
+		with self.assertRaises(download.DownloadError):
+			self._download()
+
+	def test_http_stale_connection(self):
+		self.server.drop_keepalive = True
+		self._download()
+		self.assertEqual(len(self.downloader.pool._idle[('http', '127.0.0.1', self.server.server_address[1])]), 1)
+		self.assertEqual(self._download(), (True, DATA))
+		self.sleep.assert_not_called()
+
+	def test_http_max_size(self):
+		with self.assertRaises(download.DownloadSizeError):
+			with tempfile.NamedTemporaryFile(dir=self.tmp_path) as file_h:
+				self.downloader.download(self.url, file_h, max_size=len(DATA) - 1)
+		self.sleep.assert_not_called()
+
+	def test_cache_key_includes_creds(self):
+		self._download(creds=('alice', 'password'))
+		self._download(creds=('bob', 'password'))
+		self.assertNotIn('If-None-Match', self.server.requests[1])
+
+	def test_cache_prune(self):
+		self.downloader.cache_max_size = len(DATA) + 1
+		self._download()
+		self._download(url=self.url + '?other')
+		data_files = [name for name in os.listdir(self.downloader.cache_directory) if name.endswith('.data')]
+		self.assertEqual(len(data_files), 1)
+		self.assertFalse(any(name.endswith('.tmp') for name in os.listdir(self.downloader.cache_directory)))
+
+@unittest.skipUnless(servers.has_pyftpdlib, 'pyftpdlib is not available')
+class FTPDownloadTests(unittest.TestCase):
+	def setUp(self):
+		self.tmp_path = tempfile.mkdtemp()
+		serve_path = os.path.join(self.tmp_path, 'serve')
+		os.mkdir(serve_path)
+		with open(os.path.join(serve_path, 'archive.tar.gz'), 'wb') as file_h:
+			file_h.write(DATA)
+		self.server = servers.FTPServer(serve_path).start()
+		self.url = self.server.url + 'archive.tar.gz'
+		self.downloader = download.Downloader(cache_directory=os.path.join(self.tmp_path, 'cache'), backoff=0)
+
+	def tearDown(self):
+		self.downloader.close()
+		self.server.stop()
+		shutil.rmtree(self.tmp_path)
+
+	def _download(self, prefix=b''):
+		with tempfile.NamedTemporaryFile(dir=self.tmp_path) as file_h:
+			file_h.write(prefix)
+			cached = self.downloader.download(self.url, file_h)
+			file_h.flush()
+			with open(file_h.name, 'rb') as read_h:
+				return cached, read_h.read()
+
+	def test_ftp_resume(self):
+		self.assertEqual(self._download(prefix=DATA[:0x1000]), (False, DATA))
+
+	def test_ftp_max_size(self):
+		with self.assertRaises(download.DownloadSizeError):
+			with tempfile.NamedTemporaryFile(dir=self.tmp_path) as file_h:
+				self.downloader.download(self.url, file_h, max_size=len(DATA) - 1)
+
+	def test_ftp_cache(self):
+		self._download()
+		self.assertEqual(self._download(), (True, DATA))
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  tests/test_fetch.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from jesse import fetch
+from jesse import runner
+
+class LocalFetchTests(unittest.TestCase):
+	def setUp(self):
+		self.tmp_path = tempfile.mkdtemp()
+		self.source = os.path.join(self.tmp_path, 'source')
+		os.makedirs(os.path.join(self.source, 'package'))
+		self.source_file = os.path.join(self.source, 'package', 'module.py')
+		with open(self.source_file, 'w') as file_h:
+			file_h.write("import os\nos.system('ls')\n")
+		self.destination = os.path.join(self.tmp_path, 'checkout')
+
+	def tearDown(self):
+		shutil.rmtree(self.tmp_path)
+
+	def _fetch(self, local_mode):
+		return fetch.fetch('file://' + self.source, self.destination, allow_file=True, local_mode=local_mode)
+
+	def _assert_copied(self, scan_path):
+		self.assertEqual(scan_path, self.destination)
+		with open(os.path.join(scan_path, 'package', 'module.py'), 'r') as file_h:
+			self.assertEqual(file_h.read(), "import os\nos.system('ls')\n")
+
+	def test_in_place(self):
+		self.assertEqual(self._fetch('in-place'), self.source)
+		self.assertFalse(os.path.exists(self.destination))
+
+	def test_copy(self):
+		scan_path = self._fetch('copy')
+		self._assert_copied(scan_path)
+		self.assertNotEqual(os.stat(self.source_file).st_ino, os.stat(os.path.join(scan_path, 'package', 'module.py')).st_ino)
+
+	def test_hardlink(self):
+		scan_path = self._fetch('hardlink')
+		self._assert_copied(scan_path)
+		# the source and destination are on the same file system
+		self.assertEqual(os.stat(self.source_file).st_ino, os.stat(os.path.join(scan_path, 'package', 'module.py')).st_ino)
+
+	def test_reflink(self):
+		# falls back to copying on file systems without reflink support
+		self._assert_copied(self._fetch('reflink'))
+
+	def test_unknown_mode(self):
+		with self.assertRaises(ValueError):
+			self._fetch('symlink')
+
+	def test_missing_source(self):
+		with self.assertRaises(ValueError):
+			fetch.fetch('file://' + os.path.join(self.tmp_path, 'missing'), self.destination, allow_file=True)
+
+	def test_report_path(self):
+		# reports strip the scanned path from each result's file name, so it
+		# must be the directory that fetch returned for every local mode
+		for local_mode in fetch.LOCAL_MODES:
+			if os.path.exists(self.destination):
+				shutil.rmtree(self.destination)
+			scan_path = self._fetch(local_mode)
+			scanner = runner.SubprocessRunner(scan_path, sys.executable)
+			scanner.run()
+			scanner.wait()
+			report = scanner.get_report()
+			self.assertEqual(report.data['_jj']['path'], scan_path)
+			self.assertTrue(report.data['results'])
+			for result in report.data['results']:
+				self.assertTrue(result['filename'].startswith(scan_path + os.sep))
+				self.assertEqual(result['filename'][len(report.data['_jj']['path']) + 1:], os.path.join('package', 'module.py'))
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  tests/test_metrics.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import urllib.request
+
+from jesse import metrics
+
+class MetricsTests(unittest.TestCase):
+	def setUp(self):
+		self.registry = metrics.MetricsRegistry()
+
+	def test_timed(self):
+		timings = {'phase': 1.0}
+		with metrics.timed(timings, 'phase'):
+			pass
+		self.assertGreaterEqual(timings['phase'], 1.0)
+		with self.assertRaises(RuntimeError):
+			with metrics.timed(timings, 'failed'):
+				raise RuntimeError()
+		self.assertIn('failed', timings)
+
+	def test_render_counter(self):
+		counter = self.registry.counter('scans_total', 'The number of scans.', labels=('status',))
+		counter.inc(status='completed')
+		counter.inc(2, status='completed')
+		counter.inc(status='fail"ed')
+		self.assertEqual(self.registry.render(), '\n'.join((
+			'# HELP scans_total The number of scans.',
+			'# TYPE scans_total counter',
+			'scans_total{status="completed"} 3.0',
+			'scans_total{status="fail\\"ed"} 1.0'
+		)) + '\n')
+		with self.assertRaises(ValueError):
+			counter.inc(state='completed')
+
+	def test_render_gauge_function(self):
+		gauge = self.registry.gauge('queue_depth', 'The queue depth.')
+		depth = [4]
+		gauge.set_function(lambda: depth[0])
+		self.assertIn('queue_depth 4.0\n', self.registry.render())
+		depth[0] = 2
+		self.assertIn('queue_depth 2.0\n', self.registry.render())
+
+	def test_render_histogram(self):
+		histogram = self.registry.histogram('duration_seconds', 'The duration.', buckets=(1.0, 5.0))
+		for value in (0.5, 1.0, 3.0, 10.0):
+			histogram.observe(value)
+		lines = self.registry.render().split('\n')
+		self.assertEqual(lines[2:7], [
+			'duration_seconds_bucket{le="1.0"} 2',
+			'duration_seconds_bucket{le="5.0"} 3',
+			'duration_seconds_bucket{le="+Inf"} 4',
+			'duration_seconds_sum 14.5',
+			'duration_seconds_count 4'
+		])
+
+	def test_write_textfile_periodically(self):
+		tmp_path = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, tmp_path)
+		filename = os.path.join(tmp_path, 'jesse.prom')
+		gauge = self.registry.gauge('queue_depth', 'The queue depth.')
+		gauge.set(1)
+		stop_event = self.registry.write_textfile_periodically(filename, interval=0.05)
+		self.addCleanup(stop_event.set)
+		with open(filename, 'r') as file_h:
+			self.assertIn('queue_depth 1.0', file_h.read())
+		gauge.set(2)
+		expiration = time.time() + 5
+		while time.time() < expiration:
+			with open(filename, 'r') as file_h:
+				if 'queue_depth 2.0' in file_h.read():
+					break
+			time.sleep(0.05)
+		else:
+			self.fail('the metrics file was not rewritten')
+
+	def test_serve(self):
+		self.registry.gauge('queue_depth', 'The queue depth.').set(3)
+		server = self.registry.serve(port=0)
+		self.addCleanup(server.server_close)
+		self.addCleanup(server.shutdown)
+		url = "http://127.0.0.1:{0:d}/metrics".format(server.server_address[1])
+		with urllib.request.urlopen(url) as response:
+			self.assertEqual(response.read().decode('utf-8'), self.registry.render())
+
+if __name__ == '__main__':
+	unittest.main()
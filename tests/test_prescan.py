@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  tests/test_prescan.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import os
+import shutil
+import tempfile
+import unittest
+
+from jesse import prescan
+
+class PrescanTests(unittest.TestCase):
+	def setUp(self):
+		self.target_path = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.target_path)
+
+	def _write(self, path, data=b'value = 1\n'):
+		path = os.path.join(self.target_path, path)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		with open(path, 'wb') as file_h:
+			file_h.write(data)
+		return path
+
+	def _excluded(self, result):
+		return sorted(os.path.relpath(path, self.target_path) + (os.sep if path.endswith(os.sep) else '') for path in result.excluded_paths)
+
+	def test_files(self):
+		self._write('package/module.py')
+		self._write('package/README.md')
+		result = prescan.prescan(self.target_path)
+		self.assertEqual(result.files, [os.path.join(self.target_path, 'package', 'module.py')])
+		self.assertEqual(result.byte_count, 10)
+		self.assertEqual(result.excluded_paths, [])
+
+	def test_pruned_directories(self):
+		self._write('vendor/library/module.py')
+		self._write('package/__pycache__/module.cpython-311.pyc')
+		self._write('package/module.py')
+		result = prescan.prescan(self.target_path)
+		# directories without python files are pruned without being listed
+		self.assertEqual(self._excluded(result), ['vendor' + os.sep])
+		self.assertEqual(result.pruned_paths, ['vendor'])
+		self.assertEqual(result.skipped['directory'], 2)
+
+	def test_no_default_excludes(self):
+		self._write('vendor/library/module.py')
+		result = prescan.prescan(self.target_path, excludes=())
+		self.assertEqual(result.file_count, 1)
+		self.assertEqual(result.excluded_paths, [])
+
+	def test_skipped_files(self):
+		self._write('package/module.py')
+		self._write('package/large.py', b'#' * 0x100)
+		self._write('package/binary.py', b'\x00\x01')
+		self._write('package/generated_pb2.py')
+		result = prescan.prescan(self.target_path, max_file_size=0x80)
+		self.assertEqual(result.file_count, 1)
+		self.assertEqual(self._excluded(result), ['package/binary.py', 'package/generated_pb2.py', 'package/large.py'])
+		self.assertEqual(dict(result.skipped), {'binary': 1, 'excluded': 1, 'size': 1})
+
+	def test_include_collapsing(self):
+		self._write('src/module.py')
+		self._write('other/module.py')
+		self._write('other/deep/module.py')
+		self._write('mixed/included.py')
+		self._write('mixed/filtered.py')
+		result = prescan.prescan(self.target_path, includes=('src/*', 'mixed/included.py'))
+		self.assertEqual(result.file_count, 2)
+		# fully excluded directories are listed once instead of file by file
+		self.assertEqual(self._excluded(result), ['mixed/filtered.py', 'other' + os.sep])
+		self.assertEqual(result.skipped['filtered'], 3)
+
+	def test_missing_target(self):
+		with self.assertRaises(ValueError):
+			prescan.prescan(os.path.join(self.target_path, 'missing'))
+
+	def test_budget(self):
+		self._write('a.py')
+		self._write('b.py')
+		result = prescan.prescan(self.target_path)
+		prescan.ScanBudget(max_files=2).check(result)
+		with self.assertRaises(prescan.BudgetExceededError):
+			prescan.ScanBudget(max_files=1).check(result)
+		with self.assertRaises(prescan.BudgetExceededError):
+			prescan.ScanBudget(max_bytes=19).check(result)
+		self.assertFalse(prescan.ScanBudget())
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  tests/test_report.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import unittest
+
+from benchmarks import synthetic
+from jesse import report
+
+def _report(python_version, *results):
+	data = synthetic.generate_report_data(findings=0)
+	data['python_version'] = python_version
+	data['results'] = [dict(
+		filename='/tmp/synthetic/module.py',
+		issue_confidence='HIGH',
+		issue_severity='MEDIUM',
+		issue_text='Use of possibly insecure function.',
+		line_number=line_range[-1],
+		line_range=line_range,
+		test_id=test_id
+	) for test_id, line_range in results]
+	return report.Report(data)
+
+class ReportMergeTests(unittest.TestCase):
+	def _versions(self, merged):
+		return [(result['test_id'], result['_jj']['versions']) for result in merged.data['results']]
+
+	def test_merge_shifted_lines(self):
+		# python 3.7 reports the last line of multi-line calls, 3.8 the whole range
+		merged = report.Report.merge([
+			_report('3.7', ('B307', [12]), ('B602', [20])),
+			_report('3.8', ('B307', [10, 11, 12]), ('B602', [18, 19, 20]))
+		])
+		self.assertEqual(self._versions(merged), [('B307', ['3.7', '3.8']), ('B602', ['3.7', '3.8'])])
+		self.assertFalse(any(result['_jj']['version_specific'] for result in merged.data['results']))
+
+	def test_merge_version_specific(self):
+		merged = report.Report.merge([
+			_report('3.7', ('B307', [12])),
+			_report('3.8', ('B307', [12]), ('B307', [40]))
+		])
+		self.assertEqual(self._versions(merged), [('B307', ['3.7', '3.8']), ('B307', ['3.8'])])
+		self.assertEqual(merged.data['metrics']['_totals']['SEVERITY.MEDIUM'], 2)
+
+	def test_merge_same_line(self):
+		# distinct findings on the same line are not collapsed together
+		merged = report.Report.merge([
+			_report('3.7', ('B307', [5]), ('B307', [5])),
+			_report('3.8', ('B307', [5]), ('B307', [5]))
+		])
+		self.assertEqual(self._versions(merged), [('B307', ['3.7', '3.8']), ('B307', ['3.7', '3.8'])])
+
+	def test_merge_metrics(self):
+		reports = [_report('3.7', ('B307', [5])), _report('3.8', ('B307', [5]), ('B602', [9]))]
+		for loc, timings, bandit_report in ((100, {'bandit': 2.0, 'parse': 0.1}, reports[0]), (120, {'bandit': 1.0, 'parse': 0.2}, reports[1])):
+			bandit_report.data['metrics']['_totals'].update(loc=loc, nosec=0)
+			bandit_report.data['_jj']['timings'] = timings
+		merged = report.Report.merge(reports)
+		totals = merged.data['metrics']['_totals']
+		self.assertEqual(totals['loc'], 120)
+		self.assertEqual(totals['SEVERITY.MEDIUM'], 2)
+		self.assertEqual(merged.data['_jj']['timings'], {'bandit': 2.0, 'parse': 0.2})
+		self.assertEqual(merged.data['_jj']['version_timings']['3.7'], {'bandit': 2.0, 'parse': 0.1})
+
+if __name__ == '__main__':
+	unittest.main()
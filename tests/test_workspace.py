@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  tests/test_workspace.py
+#
+#  Copyright 2016 Spencer McIntyre <zeroSteiner@gmail.com>
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the  nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from jesse import workspace
+
+def _write(path, size):
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path, 'wb') as file_h:
+		file_h.write(b'\x00' * size)
+
+class WorkspaceManagerTests(unittest.TestCase):
+	def setUp(self):
+		self.root = tempfile.mkdtemp()
+		# an old directory which belongs to the user and not to the manager
+		self.foreign_file = os.path.join(self.root, 'my_project', 'important.txt')
+		_write(self.foreign_file, 0x1000)
+		old = time.time() - 7200
+		os.utime(os.path.dirname(self.foreign_file), (old, old))
+
+	def tearDown(self):
+		shutil.rmtree(self.root)
+
+	def _saved(self, manager, size):
+		with manager.allocate(save=True) as destination:
+			_write(os.path.join(destination, 'file'), size)
+		return os.path.dirname(destination)
+
+	def _workspaces(self, manager):
+		return sorted(entry.path for entry in manager._workspaces())
+
+	def test_allocate_removes_workspace(self):
+		manager = workspace.WorkspaceManager(self.root)
+		with manager.allocate() as destination:
+			_write(os.path.join(destination, 'file'), 1)
+		self.assertEqual(self._workspaces(manager), [])
+		self.assertTrue(os.path.isfile(self.foreign_file))
+
+	def test_prune_keeps_foreign_directories(self):
+		manager = workspace.WorkspaceManager(self.root, max_saved=1)
+		self._saved(manager, 1)
+		newest = self._saved(manager, 1)
+		manager.prune()
+		self.assertEqual(self._workspaces(manager), [newest])
+		self.assertTrue(os.path.isfile(self.foreign_file))
+
+	def test_check_quota_evicts_oldest(self):
+		manager = workspace.WorkspaceManager(self.root, quota=0x180)
+		self._saved(manager, 0x100)
+		with manager.allocate() as destination:
+			_write(os.path.join(destination, 'file'), 0x100)
+			manager.check_quota()
+			self.assertEqual(self._workspaces(manager), [os.path.dirname(destination)])
+		self.assertTrue(os.path.isfile(self.foreign_file))
+
+	def test_check_quota_active_workspace_too_large(self):
+		manager = workspace.WorkspaceManager(self.root, quota=0x180)
+		saved = self._saved(manager, 0x100)
+		with self.assertRaises(workspace.WorkspaceQuotaError):
+			with manager.allocate() as destination:
+				_write(os.path.join(destination, 'file'), 0x200)
+				manager.check_quota()
+		# nothing is evicted when doing so would not help
+		self.assertEqual(self._workspaces(manager), [saved])
+		self.assertTrue(os.path.isfile(self.foreign_file))
+
+if __name__ == '__main__':
+	unittest.main()